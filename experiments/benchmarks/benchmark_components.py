@@ -0,0 +1,182 @@
+import sys
+import os
+import json
+import platform
+import datetime
+from time import perf_counter
+import numpy as np
+import pandas as pd
+
+# make possible to import from src
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from settings import SettingsDP, SettingsKBL, SettingsRLT, BigM
+from kaufman_broeckx import KaufmanBroeckxLinearization
+from kaufman_broeckx import compute_M
+from disjunctive_programming import DisjunctiveProgrammingMethod
+from disjunctive_programming import SubProblemDP
+from disjunctive_programming import cut_coefficients
+from network_flow import SubProblemFlowDP
+from reformulation_linearization_technique import ReformulationLinearizationTechnique
+import gurobipy as gp
+from gurobipy import GRB
+import data_handler as dh
+from my_secrets import my_path
+import writing_tools as wt
+import bounds as bd
+import checker as ch
+
+# * benchmark of the components of the solver stack
+# every component is timed separately on a random instance per n,
+# one record per (component, n) is written to
+# results/benchmarks/benchmark_components_<datetime>.json and .csv,
+# so later changes can be compared against the same baseline.
+# The subproblem is solved by gurobi (SubProblemDP) and as min cost flow (SubProblemFlowDP),
+# at the barycenter and at a permutation matrix.
+# Note the other gurobi models are build but not optimized, except for the solved kbl model
+# with x fixed to a random permutation which the checker and create_txt need.
+
+
+def time_component(function, repeats: int) -> dict:
+    """Calls function repeats times, returns min, median and mean wall time in seconds"""
+    times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return {'repeats': repeats,
+            'min_time': min(times),
+            'median_time': float(np.median(times)),
+            'mean_time': float(np.mean(times))}
+
+
+def benchmark_n(n: int, repeats: int, rlt_max_n: int, tmp_folder_path: str) -> list[dict]:  # noqa: PLR0914
+    """Returns the records of all components for a random instance of size n"""
+    records = []
+
+    def record(component, function, repeats=repeats):
+        result = time_component(function=function, repeats=repeats)
+        records.append({'component': component, 'n': n, **result})
+        print(f'n: {n}, {component}: {result["median_time"]:.6f} s')
+
+    # * instance
+    (A, B) = dh.generate_random_AB(n=n, seed=n)  # noqa: N806
+    data_path = tmp_folder_path + f'benchmark_n={n}.dat'
+    dh.AB_to_file(A=A, B=B, file_path=data_path)
+    q = dh.file_to_q(data_path)[0]
+
+    # * data handling
+    record('file_to_AB', lambda: dh.file_to_AB(data_path))
+    record('AB_to_q', lambda: dh.AB_to_q(A, B))
+    record('compute_M', lambda: compute_M(q=q))
+    record('big_m_lap', lambda: bd.big_m(q=q, method=BigM.LAP, exclude_diagonal=False))
+    record('big_m_sorted', lambda: bd.big_m(q=dh.FactoredQ(A=A, B=B), method=BigM.SORTED, exclude_diagonal=False))
+
+    # * model builders
+    settings_kbl = SettingsKBL(threads=1)
+    settings_dp = SettingsDP(threads=1)
+    settings_rlt = SettingsRLT(threads=1)
+    record('build_kbl', lambda: KaufmanBroeckxLinearization(q=q, settings=settings_kbl))
+
+    def build_dp():
+        dpm = DisjunctiveProgrammingMethod(q=q, settings=settings_dp)
+        dpm.dispose()
+    record('build_dp', build_dp)
+    if n <= rlt_max_n:
+        record('build_rlt', lambda: ReformulationLinearizationTechnique(q=q, settings=settings_rlt))
+
+    # * subproblem at the barycenter of the assignment polytope
+    x_hat_val = np.full((n, n), 1 / n)
+    env = gp.Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.start()
+    record('SubProblemDP_build', lambda: SubProblemDP(x_hat_val=x_hat_val, i=0, j=0, q=q, gp_sp_output=False, env=env))
+    spdp = SubProblemDP(x_hat_val=x_hat_val, i=0, j=0, q=q, gp_sp_output=False, env=env)
+
+    def solve_subproblem():
+        spdp.model.reset()
+        spdp.optimize()
+    record('SubProblemDP_solve', solve_subproblem)
+    cut_coef = cut_coefficients(spdp)
+    # the same subproblem solved as min cost flow (DPS.FLOW_SP)
+    spflow = SubProblemFlowDP(x_hat_val=x_hat_val, i=0, j=0, q=q)
+    record('SubProblemFlowDP_solve', spflow.optimize)
+
+    # both at a permutation matrix, the x_hat of DPS.ALL_MIPSOLS, with x_hat[0,0] == 1 so the subproblem is not trivial
+    x_hat_perm = np.eye(n)[np.concatenate([[0], 1 + np.random.default_rng(seed=n).permutation(n - 1)])]
+    spdp.update_x_hat(x_hat_perm)
+    spflow.update_x_hat(x_hat_perm)
+    record('SubProblemDP_solve_integral', solve_subproblem)
+    record('SubProblemFlowDP_solve_integral', spflow.optimize)
+
+    # add_benders_cut outside of a callback, builds the cut expression without cbLazy
+    dpm = DisjunctiveProgrammingMethod(q=q, settings=SettingsDP(threads=1, debug_add_benders_cuts=False))
+    record('add_benders_cut', lambda: dpm.add_benders_cut(i=0, j=0, cut_coef=cut_coef))
+    dpm.dispose()
+
+    # * solved model with x fixed to a random permutation
+    kbl = KaufmanBroeckxLinearization(q=q, settings=settings_kbl)
+    perm = np.random.default_rng(seed=n).permutation(n)
+    for i in range(n):
+        kbl.x[i, perm[i]].LB = 1
+    kbl.model.Params.OutputFlag = 0
+    kbl.model.optimize()
+    if kbl.model.Status != GRB.OPTIMAL:
+        print(f'n: {n}, fixed kbl model not optimal, status {kbl.model.Status}, skipping checker and create_txt')
+        return records
+
+    # * checker
+    record('comp_obj_val_naive', lambda: ch.comp_obj_val_naive(kbl.x, A, B))
+    record('comp_obj_val_adjorn', lambda: ch.comp_obj_val_adjorn(kbl.x, A, B), repeats=1)
+    record('comp_obj_val_perm', lambda: ch.comp_obj_val_perm(perm=perm, A=A, B=B))
+    record('check_model', lambda: ch.check_model(kbl.model, data_path))
+    record('check_model_in_memory', lambda: ch.check_model(kbl.model, data_path, A=A, B=B))
+
+    # * writing
+    all_checks = ch.check_all(model=kbl.model, data_file=data_path, sol_file=None)
+    record('create_txt', lambda: wt.create_txt(model=kbl.model,
+                                               output_folder_path=tmp_folder_path,
+                                               instance_name=f'benchmark_n={n}',
+                                               settings=settings_kbl,
+                                               solving_technique='kbl',
+                                               all_checks=all_checks,
+                                               extra_info={'build_time': kbl.model._build_time}))  # noqa: SLF001
+    return records
+
+
+def run_benchmark(ns: list[int], repeats: int = 5, rlt_max_n: int = 15) -> str:
+    """Runs benchmark_n for all n in ns and writes the records, returns the path of the json file"""
+    output_folder_path = my_path + 'results/benchmarks/'
+    tmp_folder_path = output_folder_path + 'tmp/'
+    os.makedirs(tmp_folder_path, exist_ok=True)
+
+    records = []
+    for n in ns:
+        records.extend(benchmark_n(n=n, repeats=repeats, rlt_max_n=rlt_max_n, tmp_folder_path=tmp_folder_path))
+
+    current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+    file_name = f'benchmark_components_{current_datetime}'
+    meta = {'datetime': current_datetime,
+            'ns': ns,
+            'repeats': repeats,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'gurobi': '.'.join(map(str, gp.gurobi.version())),
+            'platform': platform.platform()}
+    with open(output_folder_path + file_name + '.json', 'w') as f:
+        json.dump({'meta': meta, 'records': records}, f, indent=1)
+    pd.DataFrame(records).to_csv(output_folder_path + file_name + '.csv', index=False, sep=';')
+    return output_folder_path + file_name + '.json'
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3:  # noqa: PLR2004
+        print('Usage: python benchmark_components.py [<n_1,n_2,...>] [<repeats>]')
+        sys.exit(1)
+
+    ns = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10, 20, 30]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5  # noqa: PLR2004
+    json_path = run_benchmark(ns=ns, repeats=repeats)
+    print(f'results written to {json_path}')
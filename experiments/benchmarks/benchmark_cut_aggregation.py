@@ -0,0 +1,44 @@
+import sys
+import os
+
+# make possible to import from src
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from settings import DPS
+from my_secrets import my_path
+from benchmark_init_with import run_benchmark
+
+# * benchmark of the cut aggregation of the dp
+# every instance is solved by dp once per cut aggregation (see SettingsDP.cut_aggregation),
+# with the same records as benchmark_init_with.py, written to
+# results/benchmarks/benchmark_cut_aggregation_<datetime>.json and .csv.
+# Note with the default callback_at DPS.ALL_MIPSOLS x_hat is a permutation, so only the pairs (i, perm[i]) are violated,
+# one per row and column, then row and column aggregation add the same cuts as multi cut. With the default
+# min_relative_violation of 0 pairs with x_hat[i,j] == 0 and w_hat[i,j] just below 0 (within the gurobi tolerances)
+# get cuts as well, which makes row and column differ from multi cut.
+
+# the kbl initialisation is exact at integral points (no cuts are needed) and the gl initialisation bounds
+# the master from the start, both are turned off so the cuts of the aggregation are what is measured
+NO_INIT = {'init_with_kbl': False, 'init_with_xy': False, 'init_with_gl': False}
+CUT_AGGREGATIONS = {'multi': {**NO_INIT, 'cut_aggregation': DPS.MULTI_CUT},
+                    'single': {**NO_INIT, 'cut_aggregation': DPS.SINGLE_CUT},
+                    'row': {**NO_INIT, 'cut_aggregation': DPS.ROW_CUT},
+                    'column': {**NO_INIT, 'cut_aggregation': DPS.COLUMN_CUT},
+                    'hybrid': {**NO_INIT, 'cut_aggregation': DPS.HYBRID_CUT}}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 4:  # noqa: PLR2004
+        print('Usage: python benchmark_cut_aggregation.py [<instance_1,instance_2,...>] [<time_limit>] [<data_folder>]')
+        sys.exit(1)
+
+    instances = sys.argv[1].split(',') if len(sys.argv) > 1 else ['nug12', 'chr12a', 'esc16a', 'tai12a']
+    time_limit = float(sys.argv[2]) if len(sys.argv) > 2 else 600  # noqa: PLR2004
+    # relative to my_path, e.g. data/generated/ for the instances of generate_instances.py
+    data_folder = sys.argv[3] if len(sys.argv) > 3 else 'data/QAPLIB/qapdata/'  # noqa: PLR2004
+    data_paths = [my_path + f'{data_folder}{instance}.dat' for instance in instances]
+    json_path = run_benchmark(data_paths=data_paths, time_limit=time_limit, variants=CUT_AGGREGATIONS,
+                              name='benchmark_cut_aggregation')
+    print(f'results written to {json_path}')
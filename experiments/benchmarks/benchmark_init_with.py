@@ -0,0 +1,98 @@
+import sys
+import os
+import json
+import platform
+import datetime
+import numpy as np
+import pandas as pd
+
+# make possible to import from src
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from settings import SettingsDP
+from disjunctive_programming import solve_with_dp
+import gurobipy as gp
+import data_handler as dh
+from my_secrets import my_path
+
+# * benchmark of the initialisations of the dp master
+# every instance is solved by dp once per initialisation (kbl, xy, gl and kbl with gl),
+# one record per (instance, variant) with the number of benders callbacks (model._benders_started_count),
+# the total number of cuts, the root bound of the master and the times is written to
+# results/benchmarks/benchmark_init_with_<datetime>.json and .csv.
+
+INITS = {'kbl': {'init_with_kbl': True, 'init_with_xy': False, 'init_with_gl': False},
+         'xy': {'init_with_kbl': False, 'init_with_xy': True, 'init_with_gl': False},
+         'gl': {'init_with_kbl': False, 'init_with_xy': False, 'init_with_gl': True},
+         'kbl_gl': {'init_with_kbl': True, 'init_with_xy': False, 'init_with_gl': True}}
+
+
+def benchmark_instance(data_path: str, time_limit: float, variants: dict[str, dict] = INITS) -> list[dict]:
+    """Returns one record per variant, a name and its SettingsDP arguments, for the instance at data_path"""
+    (q, instance_name) = dh.file_to_q(data_path)
+    records = []
+    for (variant_name, variant_settings) in variants.items():
+        settings = SettingsDP(threads=1, time_limit=time_limit, **variant_settings)
+        model = solve_with_dp(q=q, settings=settings)
+        record = {'instance': instance_name,
+                  'n': q.shape[0],
+                  'variant': variant_name,
+                  'status': model.Status,
+                  'obj_val': model.ObjVal if model.SolCount > 0 else None,
+                  'obj_bound': model.ObjBound,
+                  'benders_started_count': model._benders_started_count,  # noqa: SLF001
+                  'callback_call_count': model._callback_call_count,  # noqa: SLF001
+                  'total_num_cuts': model._total_num_cuts,  # noqa: SLF001
+                  'num_vars': model.NumVars,
+                  'num_constrs': model.NumConstrs,
+                  'num_nz': model.NumNZs,
+                  'build_time': model._build_time,  # noqa: SLF001
+                  'run_time': model.Runtime,
+                  'time_in_user_cb': model._total_time_in_user_cb}  # noqa: SLF001
+        print(f'{instance_name}, {variant_name}: callbacks {record["benders_started_count"]}, '
+              f'cuts {record["total_num_cuts"]}, run time {record["run_time"]:.2f} s')
+        records.append(record)
+    return records
+
+
+def run_benchmark(data_paths: list[str], time_limit: float = 600, variants: dict[str, dict] = INITS,
+                  name: str = 'benchmark_init_with') -> str:
+    """Runs benchmark_instance for all data_paths and writes the records to name_<datetime>,\n
+    returns the path of the json file"""
+    output_folder_path = my_path + 'results/benchmarks/'
+    os.makedirs(output_folder_path, exist_ok=True)
+
+    records = []
+    for data_path in data_paths:
+        records.extend(benchmark_instance(data_path=data_path, time_limit=time_limit, variants=variants))
+
+    current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+    file_name = f'{name}_{current_datetime}'
+    meta = {'datetime': current_datetime,
+            'data_paths': data_paths,
+            'time_limit': time_limit,
+            'variants': variants,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'gurobi': '.'.join(map(str, gp.gurobi.version())),
+            'platform': platform.platform()}
+    with open(output_folder_path + file_name + '.json', 'w') as f:
+        json.dump({'meta': meta, 'records': records}, f, indent=1, default=str)
+    pd.DataFrame(records).to_csv(output_folder_path + file_name + '.csv', index=False, sep=';')
+    return output_folder_path + file_name + '.json'
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 4:  # noqa: PLR2004
+        print('Usage: python benchmark_init_with.py [<instance_1,instance_2,...>] [<time_limit>] [<data_folder>]')
+        sys.exit(1)
+
+    instances = sys.argv[1].split(',') if len(sys.argv) > 1 else ['nug12', 'chr12a', 'esc16a', 'tai12a']
+    time_limit = float(sys.argv[2]) if len(sys.argv) > 2 else 600  # noqa: PLR2004
+    # relative to my_path, e.g. data/generated/ for the instances of generate_instances.py
+    data_folder = sys.argv[3] if len(sys.argv) > 3 else 'data/QAPLIB/qapdata/'  # noqa: PLR2004
+    data_paths = [my_path + f'{data_folder}{instance}.dat' for instance in instances]
+    json_path = run_benchmark(data_paths=data_paths, time_limit=time_limit)
+    print(f'results written to {json_path}')
@@ -0,0 +1,65 @@
+import sys
+import os
+import numpy as np
+
+# make possible to import from src
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+import data_handler as dh
+
+# * generated instances of the benchmarks
+# QAPLIB is not part of the repository, so the benchmarks were run on small instances in data/generated/,
+# written by this file with one generator of seed 0 in the order of generate_instances, per n
+#   gnug<n>   Manhattan distances of a grid and random symmetric flows in [0, 5] with about 40% of them zero,
+#   gtai<n>a  symmetric distances and flows uniform in [1, 99] with zero diagonal,
+#   gesc<n>   Manhattan distances of a grid and flow on a path of 4 facilities only, the other facilities have no flow.
+# Running this file writes them again, byte for byte, the benchmarks read them with data_folder data/generated/.
+
+GRIDS = {8: (2, 4), 9: (3, 3)}
+
+
+def grid_distances(rows: int, cols: int) -> np.ndarray:
+    """Returns the Manhattan distances between the points of a rows x cols grid, in row major order"""
+    points = [(a, b) for a in range(rows) for b in range(cols)]
+    return np.array([[abs(p[0] - r[0]) + abs(p[1] - r[1]) for r in points] for p in points])
+
+
+def symmetric_zero_diagonal(C: np.ndarray) -> np.ndarray:  # noqa: N803
+    """Returns the symmetric matrix with the upper triangle of C and a zero diagonal"""
+    upper = np.triu(C, 1)
+    return upper + upper.T
+
+
+def generate_instances(output_folder_path: str, grids: dict[int, tuple[int, int]] = GRIDS, seed: int = 0) -> list[str]:
+    """Writes the gnug, gtai and gesc instances of every n in grids to output_folder_path, returns their paths"""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for (n, (rows, cols)) in grids.items():
+        A = grid_distances(rows=rows, cols=cols)  # noqa: N806
+        B = symmetric_zero_diagonal(rng.integers(0, 6, (n, n)))  # noqa: N806
+        B[rng.random((n, n)) < 0.3] = 0  # noqa: PLR2004
+        B = symmetric_zero_diagonal(B)  # noqa: N806
+        paths.append(output_folder_path + f'gnug{n}.dat')
+        dh.AB_to_file(A=A, B=B, file_path=paths[-1])
+
+        A = symmetric_zero_diagonal(rng.integers(1, 100, (n, n)))  # noqa: N806
+        B = symmetric_zero_diagonal(rng.integers(1, 100, (n, n)))  # noqa: N806
+        paths.append(output_folder_path + f'gtai{n}a.dat')
+        dh.AB_to_file(A=A, B=B, file_path=paths[-1])
+
+        A = grid_distances(rows=rows, cols=cols)  # noqa: N806
+        B = np.zeros((n, n), dtype=int)  # noqa: N806
+        for (j, l, flow) in [(0, 1, 3), (1, 2, 2), (2, 3, 1)]:
+            B[j, l] = B[l, j] = flow
+        paths.append(output_folder_path + f'gesc{n}.dat')
+        dh.AB_to_file(A=A, B=B, file_path=paths[-1])
+    return paths
+
+
+if __name__ == '__main__':
+    output_folder_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'generated')) + '/'
+    os.makedirs(output_folder_path, exist_ok=True)
+    for path in generate_instances(output_folder_path=output_folder_path):
+        print(f'written {path}')
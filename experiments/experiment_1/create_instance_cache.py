@@ -0,0 +1,26 @@
+import sys
+import os
+
+# make possible to import from src
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from my_secrets import my_path
+from instance_cache import InstanceCache
+
+
+def create_instance_cache(data_dir, sol_dir, cache_dir):
+    cache = InstanceCache(cache_dir)
+    failed = cache.build(data_dir=data_dir, sol_dir=sol_dir)
+    for file_name, error in failed:
+        print(f'could not cache {file_name}, Error: {error}')
+    return cache
+
+
+if __name__ == '__main__':
+    data_dir_path = my_path + 'data/QAPLIB/qapdata'
+    sol_dir_path = my_path + 'data/QAPLIB/qapsoln'
+    cache_dir_path = my_path + 'data/QAPLIB/cache/'
+    cache = create_instance_cache(data_dir_path, sol_dir_path, cache_dir_path)
+    print(f'cached {len(cache.index["instances"])} instances and {len(cache.index["solutions"])} solutions in {cache_dir_path}')
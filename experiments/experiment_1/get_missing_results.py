@@ -1,4 +1,5 @@
 from get_data_list import get_data_list
+from main_experiment_1 import get_settings, get_manifest
 import os
 import sys
 
@@ -8,10 +9,12 @@ if src_path not in sys.path:
     sys.path.append(src_path)
 
 from my_secrets import my_path
+from job_manifest import JobManifest, settings_hash
 
 
 def get_instances_ran():
-    """outputs instances_ran_w_dp, instances_ran_w_kbl"""
+    """outputs instances_ran_w_dp, instances_ran_w_kbl\n
+    Scrapes the output txt files, only needed for results from before the manifest existed."""
     instances_ran_w_dp = []
     instances_ran_w_kbl = []
     for file_name in os.listdir(my_path + 'results/experiment_1'):
@@ -48,6 +51,8 @@ def get_missing(data_list, instances_ran_w_dp, instances_ran_w_kbl):
     """returns missing_dp, missing_kbl"""
     missing_dp = []
     missing_kbl = []
+    instances_ran_w_dp = set(instances_ran_w_dp)
+    instances_ran_w_kbl = set(instances_ran_w_kbl)
     for instance in data_list:
         if instance not in instances_ran_w_dp:
             missing_dp.append(instance)
@@ -56,6 +61,16 @@ def get_missing(data_list, instances_ran_w_dp, instances_ran_w_kbl):
     return missing_dp, missing_kbl
 
 
+def get_missing_from_manifest(data_list, manifest: JobManifest):
+    """returns missing_dp, missing_kbl, the instances that are not done with the current settings of experiment 1"""
+    hashes = {method_name: settings_hash(settings) for method_name, settings in get_settings().items()}
+    missing = {}
+    for method_name in ('dp', 'kbl'):
+        jobs = [(instance, method_name, hashes[method_name]) for instance in data_list]
+        missing[method_name] = [instance for (instance, _, _) in manifest.missing(jobs)]
+    return missing['dp'], missing['kbl']
+
+
 def create_missing_txt(output_file, missing):
     with open(output_file, 'w') as f:
         for file_name in missing:
@@ -64,10 +79,14 @@ def create_missing_txt(output_file, missing):
 
 if __name__ == '__main__':
     data_list = get_data_list()
-    instances_ran_w_dp, instances_ran_w_kbl = get_instances_ran()
-    missing_dp, missing_kbl = get_missing(data_list=data_list,
-                                          instances_ran_w_dp=instances_ran_w_dp,
-                                          instances_ran_w_kbl=instances_ran_w_kbl)
+    manifest = get_manifest()
+    if os.path.exists(manifest.file_path):
+        missing_dp, missing_kbl = get_missing_from_manifest(data_list=data_list, manifest=manifest)
+    else:
+        instances_ran_w_dp, instances_ran_w_kbl = get_instances_ran()
+        missing_dp, missing_kbl = get_missing(data_list=data_list,
+                                              instances_ran_w_dp=instances_ran_w_dp,
+                                              instances_ran_w_kbl=instances_ran_w_kbl)
     
     output_file_dp = my_path + 'experiments/experiment_1/missing_dp.txt'
     output_file_kbl = my_path + 'experiments/experiment_1/missing_kbl.txt'
@@ -16,9 +16,11 @@ import data_handler as dh
 from my_secrets import my_path
 import writing_tools as wt
 import checker as ch
+from job_manifest import JobManifest, JobState, settings_hash
+from instance_cache import InstanceCache
 
 
-def do_experiment(data_file_name: str):  # noqa: PLR0914
+def do_experiment(data_file_name: str, method_names: tuple[str, ...] = ('dp', 'kbl')):  # noqa: PLR0914
     # * specify output
     output_folder_name = 'results/experiment_1/'
     output_folder_path = my_path + output_folder_name
@@ -28,33 +30,21 @@ def do_experiment(data_file_name: str):  # noqa: PLR0914
     sol_path = get_sol_path(data_file_name)
 
     # * get instance
-    (q, instance_name) = dh.file_to_q(data_path)
+    cache = get_cache()
+    (q, instance_name) = dh.file_to_q(data_path, cache=cache)
 
     # * specify solving methods
-    do_dp = True
-    do_kbl = True
+    do_dp = 'dp' in method_names
+    do_kbl = 'kbl' in method_names
 
     # * specify settings
-    settings_dp = SettingsDP(x_is_bin=True,
-                             init_with_kbl=True,
-                             init_with_xy=False,
-                             callback_at=DPS.ALL_MIPSOLS,
-                             bd_constr_type=DPS.LAZY_CONSTR,
-                             pre_crush=True,
-                             minimum_w_difference=0,
-                             time_limit=60*60,
-                             threads=1,
-                             soft_mem_limit=3.6)
-    settings_kbl = SettingsKBL(pre_crush=True,
-                               time_limit=60*60,
-                               threads=1,
-                               soft_mem_limit=3.6)
+    all_settings = get_settings()
 
     methods = []
     if do_dp:
-        methods.append(("dp", solve_with_dp, settings_dp))
+        methods.append(("dp", solve_with_dp, all_settings['dp']))
     if do_kbl:
-        methods.append(("kbl", solve_with_kbl, settings_kbl))
+        methods.append(("kbl", solve_with_kbl, all_settings['kbl']))
 
     # solve and write to txt
     for method_name, solve_with_method, settings in methods:
@@ -69,9 +59,13 @@ def do_experiment(data_file_name: str):  # noqa: PLR0914
         
         all_checks = ch.check_all(model=model,
                                 data_file=data_path,
-                                sol_file=sol_path)
+                                sol_file=sol_path,
+                                cache=cache,
+                                A=q.A,
+                                B=q.B,
+                                obj_val_tol=ch.model_obj_val_tol(solving_technique=method_name, settings=settings))
         
-        extra_info = {'raw_time': raw_time}
+        extra_info = {'raw_time': raw_time, 'build_time': model._build_time}
         
         wt.create_txt(model=model,
                     output_folder_path=output_folder_path,
@@ -82,6 +76,35 @@ def do_experiment(data_file_name: str):  # noqa: PLR0914
                     extra_info=extra_info)
 
 
+def get_settings() -> dict:
+    """Returns the settings of experiment 1 per method name"""
+    settings_dp = SettingsDP(x_is_bin=True,
+                             init_with_kbl=True,
+                             init_with_xy=False,
+                             callback_at=DPS.ALL_MIPSOLS,
+                             bd_constr_type=DPS.LAZY_CONSTR,
+                             pre_crush=True,
+                             minimum_w_difference=0,
+                             time_limit=60*60,
+                             threads=1,
+                             soft_mem_limit=3.6,
+                             telemetry_dir=my_path + 'results/experiment_1/telemetry/')
+    settings_kbl = SettingsKBL(pre_crush=True,
+                               time_limit=60*60,
+                               threads=1,
+                               soft_mem_limit=3.6)
+    return {'dp': settings_dp, 'kbl': settings_kbl}
+
+
+def get_manifest() -> JobManifest:
+    return JobManifest(my_path + 'results/experiment_1/manifest.jsonl')
+
+
+def get_cache() -> InstanceCache:
+    """Read only, see create_instance_cache.py for converting the data once"""
+    return InstanceCache(my_path + 'data/QAPLIB/cache/', read_only=True)
+
+
 def get_sol_path(data_file_name):
     sol_path_candidate = my_path + 'data/QAPLIB/qapsoln/' + data_file_name.split('.')[0] + '.sln'
     sol_path = sol_path_candidate if os.path.exists(sol_path_candidate) else None
@@ -97,19 +120,27 @@ if __name__ == '__main__':
     data_index_stop = int(sys.argv[2])
 
     data_list = get_data_list()
+    manifest = get_manifest()
+    hashes = {method_name: settings_hash(settings) for method_name, settings in get_settings().items()}
     # min 0 max 135,
     # for running on all data use range(0, 136)
-    # this experiment was rain in parallel with multiple smaler ranges
+    # this experiment was rain in parallel with multiple smaler ranges,
+    # see schedule_experiment_1.py for running all of them within a core and memory budget
     for data_index in range(data_index_start, data_index_stop):
         data_file_name = data_list[data_index]
-        try:
-            do_experiment(data_file_name=data_file_name)
-        except Exception as e:  # noqa: BLE001
-            print(f'An error occurred while running on {data_file_name},\nError: {e}')
-            with open(my_path + 'results/experiment_1/errors.txt', 'a') as f:
-                f.write('\nAn error occurred while running\n')
-                current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
-                f.write(f'day_time: {current_datetime}\n')
-                f.write(f'data_file_name: {data_file_name}\n')
-                f.write(f'data_index: {data_index}\n')
-                f.write(f'Error: {e}\n')
+        for method_name in hashes:
+            manifest.append(data_file_name, method_name, hashes[method_name], JobState.RUNNING, pid=os.getpid())
+            try:
+                do_experiment(data_file_name=data_file_name, method_names=(method_name,))
+                manifest.append(data_file_name, method_name, hashes[method_name], JobState.DONE)
+            except Exception as e:  # noqa: BLE001
+                manifest.append(data_file_name, method_name, hashes[method_name], JobState.FAILED, error=str(e))
+                print(f'An error occurred while running {method_name} on {data_file_name},\nError: {e}')
+                with open(my_path + 'results/experiment_1/errors.txt', 'a') as f:
+                    f.write('\nAn error occurred while running\n')
+                    current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+                    f.write(f'day_time: {current_datetime}\n')
+                    f.write(f'data_file_name: {data_file_name}\n')
+                    f.write(f'method_name: {method_name}\n')
+                    f.write(f'data_index: {data_index}\n')
+                    f.write(f'Error: {e}\n')
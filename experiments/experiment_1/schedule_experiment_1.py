@@ -0,0 +1,141 @@
+from get_data_list import get_data_list
+from main_experiment_1 import do_experiment, get_settings, get_manifest
+from create_instance_cache import create_instance_cache
+import sys
+import os
+import datetime
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+# make possible to import from src
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+if src_path not in sys.path:
+    sys.path.append(src_path)
+
+from my_secrets import my_path
+from job_manifest import JobManifest, JobState, settings_hash
+import data_handler as dh
+
+# * scheduler
+# runs all (instance, method) jobs of data_list.txt within a core and memory budget,
+# every job runs single threaded (threads=1 in do_experiment) in a fresh process of its own,
+# so a gurobi crash or a memory blow-up ends only that job and is written to errors.txt.
+# Jobs are started longest first, estimated by the instance size n.
+# The state of every job is recorded in the manifest (see job_manifest.py) by the scheduler process,
+# jobs that are done with the current settings are skipped, so a stopped run is resumed by starting it again.
+
+# memory reserved per job in GB, the soft_mem_limit of do_experiment plus python and model overhead
+JOB_MEMORY = 4.
+METHOD_NAMES = ('dp', 'kbl')
+
+
+def get_instance_n(data_file_name: str) -> int:
+    """Returns n of the data file, parsed by data_handler.parse_AB which also checks the number of entries"""
+    (A, _) = dh.parse_AB(my_path + 'data/QAPLIB/qapdata/' + data_file_name)  # noqa: N806
+    return A.shape[0]
+
+
+def get_jobs(data_list: list[str], method_names: tuple[str, ...] = METHOD_NAMES) -> list[tuple[int, str, str]]:
+    """Returns a list of (n, data_file_name, method_name) sorted by decreasing n"""
+    jobs = [(get_instance_n(data_file_name), data_file_name, method_name)
+            for data_file_name in data_list for method_name in method_names]
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    return jobs
+
+
+def run_job(data_file_name: str, method_name: str, conn):
+    """Entry point of a job process, sends None on success and the traceback otherwise"""
+    try:
+        do_experiment(data_file_name=data_file_name, method_names=(method_name,))
+        conn.send(None)
+    except Exception:  # noqa: BLE001
+        conn.send(traceback.format_exc())
+    conn.close()
+
+
+def write_error(data_file_name: str, method_name: str, error: str):
+    print(f'An error occurred while running {method_name} on {data_file_name},\nError: {error}')
+    with open(my_path + 'results/experiment_1/errors.txt', 'a') as f:
+        f.write('\nAn error occurred while running\n')
+        current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+        f.write(f'day_time: {current_datetime}\n')
+        f.write(f'data_file_name: {data_file_name}\n')
+        f.write(f'method_name: {method_name}\n')
+        f.write(f'Error: {error}\n')
+
+
+def finish_job(process, conn, data_file_name: str, method_name: str) -> str | None:
+    """Receives the message of a job, then joins its process and writes its error, if any, to errors.txt,\n
+    returns the error or None. The message is received first, a process blocked on sending a long traceback\n
+    through a full pipe would otherwise never end and the join would wait forever."""
+    try:
+        error = conn.recv() if conn.poll() else None
+    except EOFError:
+        # the pipe was closed without a message
+        error = None
+    conn.close()
+    process.join()
+    if error is None and process.exitcode != 0:
+        # no message was sent, the process was killed e.g. by a crash of gurobi or the out of memory killer
+        error = f'job process ended with exit code {process.exitcode}'
+    if error is not None:
+        write_error(data_file_name=data_file_name, method_name=method_name, error=error)
+    return error
+
+
+def schedule(jobs: list[tuple[int, str, str]], cores: int, memory: float,
+             manifest: JobManifest, hashes: dict[str, str]):
+    """Runs jobs with at most min(cores, memory // JOB_MEMORY) job processes at the same time,\n
+    hashes holds the settings hash per method name under which the jobs are recorded in manifest."""
+    num_workers = min(cores, int(memory // JOB_MEMORY))
+    if num_workers < 1:
+        raise ValueError(f'the budget of {cores} cores and {memory} GB does not fit a single job of {JOB_MEMORY} GB')
+    print(f'running {len(jobs)} jobs on {num_workers} workers')
+    for (_, data_file_name, method_name) in jobs:
+        manifest.append(data_file_name, method_name, hashes[method_name], JobState.QUEUED)
+
+    # spawn instead of fork, every job starts from a clean interpreter
+    ctx = mp.get_context('spawn')
+    pending = list(jobs)
+    # the receiving end of the pipe of a job is ready when its message was sent or the process ended (end of file)
+    running = {}  # conn -> (process, conn, data_file_name, method_name)
+    while pending or running:
+        while pending and len(running) < num_workers:
+            (n, data_file_name, method_name) = pending.pop(0)
+            (recv_conn, send_conn) = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=run_job, args=(data_file_name, method_name, send_conn))
+            process.start()
+            send_conn.close()
+            manifest.append(data_file_name, method_name, hashes[method_name], JobState.RUNNING, pid=process.pid)
+            running[recv_conn] = (process, recv_conn, data_file_name, method_name)
+            print(f'started {method_name} on {data_file_name} (n={n}), {len(pending)} jobs pending')
+
+        for ready_conn in wait(list(running)):
+            (process, recv_conn, data_file_name, method_name) = running.pop(ready_conn)
+            error = finish_job(process=process, conn=recv_conn, data_file_name=data_file_name, method_name=method_name)
+            if error is None:
+                manifest.append(data_file_name, method_name, hashes[method_name], JobState.DONE)
+            else:
+                manifest.append(data_file_name, method_name, hashes[method_name], JobState.FAILED, error=error)
+            print(f'finished {method_name} on {data_file_name}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:  # noqa: PLR2004
+        print('Usage: python schedule_experiment_1.py <cores> <memory_in_GB>')
+        sys.exit(1)
+
+    cores = int(sys.argv[1])
+    memory = float(sys.argv[2])
+    # convert new or changed data files once, the jobs open the cache read only
+    create_instance_cache(data_dir=my_path + 'data/QAPLIB/qapdata',
+                          sol_dir=my_path + 'data/QAPLIB/qapsoln',
+                          cache_dir=my_path + 'data/QAPLIB/cache/')
+    manifest = get_manifest()
+    hashes = {method_name: settings_hash(settings) for method_name, settings in get_settings().items()}
+    # skip the jobs that are done with the current settings
+    states = manifest.states()
+    jobs = [(n, data_file_name, method_name) for (n, data_file_name, method_name) in get_jobs(data_list=get_data_list())
+            if states.get((data_file_name, method_name, hashes[method_name])) != JobState.DONE]
+    schedule(jobs=jobs, cores=cores, memory=memory, manifest=manifest, hashes=hashes)
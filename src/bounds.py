@@ -0,0 +1,93 @@
+# this document contains per pair (i, j) bounds on the cost of the remaining assignment
+# for x[i,j] = 1 the other locations k not i are assigned facilities l not j by a permutation,
+# so sum {k not i} q[i][j][k][perm[k]] lies between the minimum and the maximum linear assignment of the
+# (n-1, n-1) matrix q[i][j] without row i and column j.
+# * Gilmore-Lawler
+# GL[i, j] is that minimum assignment, w[i,j] >= GL[i,j] * x[i,j] holds for w of dp.
+# For a FactoredQ the matrix is the outer product of A[i, k not i] and B[j, l not j],
+# whose minimum assignment is the scalar product of the ascending sorted row of A
+# and the descending sorted row of B (rearrangement inequality), one matrix product for all pairs.
+# For a dense q an assignment problem is solved per pair.
+# * big M
+# the kbl constraint w[i,j] >= sum_{k,l} q[i][j][k][l] * x[k,l] - M[i][j] * (1 - x[i,j]) needs M[i][j] at least
+# the maximum of the sum for x[i,j] == 0, the sum over all entries (BigM.SUM) is far above it for nonnegative q,
+# since only one l per k is active. BigM.LAP uses the maximum weight assignment of the nonnegative part of q[i][j],
+# with the entry (i, j) excluded for kbl and row i and column j excluded for dp (w of dp is without them).
+# BigM.SORTED bounds that assignment for a FactoredQ by sorted products of the rows of A and B,
+# for all pairs at once, by splitting A[i][k] * B[j][l] into the products of positive and of negative parts,
+# (entry (i, j) is not excluded for kbl so it can be slightly weaker than BigM.LAP), for a dense q it falls back to BigM.LAP.
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+import data_handler as dh
+from settings import BigM
+
+
+def off_diagonal_rows(C: np.ndarray) -> np.ndarray:  # noqa: N803
+    """Returns the (n, n-1) rows of C without their diagonal entry"""
+    n = C.shape[0]
+    return C[~np.eye(n, dtype=bool)].reshape(n, n - 1)
+
+
+def gilmore_lawler_bounds(q) -> np.ndarray:
+    """Returns the (n, n) matrix GL with GL[i, j] the minimum of sum {k not i} q[i][j][k][perm[k]]\n
+    over all permutations perm with perm[i] == j."""
+    if isinstance(q, dh.FactoredQ):
+        a_sorted = np.sort(off_diagonal_rows(np.asarray(q.A, dtype=float)), axis=1)
+        b_sorted = -np.sort(-off_diagonal_rows(np.asarray(q.B, dtype=float)), axis=1)
+        return a_sorted @ b_sorted.T
+
+    n = q.shape[0]
+    GL = np.zeros((n, n))  # noqa: N806
+    for i in range(n):
+        ks = np.array([k for k in range(n) if k != i])
+        for j in range(n):
+            ls = np.array([l for l in range(n) if l != j])  # noqa: E741
+            c = np.asarray(q[i][j], dtype=float)[np.ix_(ks, ls)]
+            (rows, cols) = linear_sum_assignment(c)
+            GL[i, j] = c[rows, cols].sum()
+    return GL
+
+
+def big_m(q, method: BigM, exclude_diagonal: bool) -> np.ndarray:
+    """Returns the (n, n) big M of the kbl constraints on w computed by method,\n
+    with exclude_diagonal set to True the terms with k == i or l == j are left out, as in the init_with_kbl constraints of dp."""
+    if method == BigM.SUM:
+        return np.asarray(q.sum(axis=(2, 3)), dtype=float)
+    if method == BigM.SORTED and isinstance(q, dh.FactoredQ):
+        return sorted_product_big_m(A=q.A, B=q.B, exclude_diagonal=exclude_diagonal)
+    if method in {BigM.LAP, BigM.SORTED}:
+        return assignment_big_m(q=q, exclude_diagonal=exclude_diagonal)
+    raise ValueError('big_m setting is not BigM.SUM, BigM.LAP or BigM.SORTED')
+
+
+def assignment_big_m(q, exclude_diagonal: bool) -> np.ndarray:
+    """Returns M[i, j] the maximum weight assignment of the nonnegative part of q[i][j],\n
+    without entry (i, j) or, with exclude_diagonal, without row i and column j."""
+    n = q.shape[0]
+    M = np.zeros((n, n))  # noqa: N806
+    for i in range(n):
+        ks = np.array([k for k in range(n) if k != i]) if exclude_diagonal else np.arange(n)
+        for j in range(n):
+            c = np.maximum(np.asarray(q[i][j], dtype=float), 0.)
+            if exclude_diagonal:
+                ls = np.array([l for l in range(n) if l != j])  # noqa: E741
+                c = c[np.ix_(ks, ls)]
+            else:
+                c[i, j] = 0.
+            (rows, cols) = linear_sum_assignment(c, maximize=True)
+            M[i, j] = c[rows, cols].sum()
+    return M
+
+
+def sorted_product_big_m(A: np.ndarray, B: np.ndarray, exclude_diagonal: bool) -> np.ndarray:  # noqa: N803
+    """Returns the upper bound M[i, j] = sort(a+) . sort(b+) + sort(a-) . sort(b-) on every assignment of the rows\n
+    a = A[i] and b = B[j], (with exclude_diagonal without their diagonal entries), where a+ and a- are the positive\n
+    and negative parts, the maximum assignment of an outer product pairs the entries in sorted order."""
+    A = np.asarray(A, dtype=float)  # noqa: N806
+    B = np.asarray(B, dtype=float)  # noqa: N806
+    if exclude_diagonal:
+        A = off_diagonal_rows(A)  # noqa: N806
+        B = off_diagonal_rows(B)  # noqa: N806
+    M = np.sort(np.maximum(A, 0.), axis=1) @ np.sort(np.maximum(B, 0.), axis=1).T  # noqa: N806
+    M += np.sort(np.maximum(-A, 0.), axis=1) @ np.sort(np.maximum(-B, 0.), axis=1).T
+    return M
@@ -5,47 +5,57 @@ from gurobipy import GRB
 from itertools import product
 import numpy as np
 
+# relative tolerance on objective values of a dp model initialised with the gilmore-lawler rows (init_with_gl),
+# gurobi accepts solutions that violate bounds and constraints up to its feasibility tolerance (1e-6 by default),
+# there a w can end slightly below 0, shifting model.ObjVal by about as much. Other models are checked exactly.
+OBJ_VAL_TOL = 1e-6
 
-def check_all(model: gp.Model, data_file: str, sol_file: str): # tuple[tuple[bool, bool, bool], tuple[str, str, str]]: # todo improve sol file not provided handeling
+
+def check_all(model: gp.Model, data_file: str, sol_file: str, cache=None, A=None, B=None, obj_val_tol: float = 0.): # tuple[tuple[bool, bool, bool], tuple[str, str, str]]: # todo improve sol file not provided handeling  # noqa: N803, PLR0913, PLR0917
     """Given __ will check,\n
     if sol is consistent with data,\n
     if model attains objective it claims, and \n
     if sol file optimum is equal to model optimum.\n
-    Returns ((sol_consist_w_data, model_consist_w_data, obj_val_match), ('', model_warnings, '')"""
+    Returns ((sol_consist_w_data, model_consist_w_data, obj_val_match), ('', model_warnings, '')\n
+    When A and B are given the data file is not read again,\n
+    when cache (an instance_cache.InstanceCache) is given data and solution files are loaded from it.\n
+    Objective values are compared up to the relative tolerance obj_val_tol, see model_obj_val_tol."""
+    if A is None or B is None:
+        (A, B) = dh.file_to_AB(data_file, cache=cache)  # noqa: N806
     
     if sol_file:
-        (_, sol_obj_val, _) = sol_file_to_info(sol_file) # todo (low priority) optimize sol_file_to_info() is also called inside check_sol_file()
-        sol_consist_w_data = check_sol_file(data_file, sol_file)
+        (_, sol_obj_val, _) = sol_file_to_info(sol_file, cache=cache) # todo (low priority) optimize sol_file_to_info() is also called inside check_sol_file()
+        sol_consist_w_data = check_sol_file(data_file, sol_file, cache=cache, A=A, B=B)
     else:
         sol_consist_w_data = 'sol_file_not_provided'
-    model_consist_w_data, model_warnings = check_model(model, data_file)
+    model_consist_w_data, model_warnings = check_model(model, data_file, cache=cache, A=A, B=B, obj_val_tol=obj_val_tol)
     
-    obj_val_match = sol_obj_val == model.ObjVal if sol_file else 'sol_file_not_provided'
+    obj_val_match = obj_vals_match(model.ObjVal, sol_obj_val, tol=obj_val_tol) if sol_file else 'sol_file_not_provided'
     
     return ((sol_consist_w_data, model_consist_w_data, obj_val_match), ('', model_warnings, ''))
 
 
-def check_sol_file(data_file, sol_file) -> bool:
+def check_sol_file(data_file, sol_file, cache=None, A=None, B=None) -> bool:  # noqa: N803, PLR0913, PLR0917
     """Given data file and solution file,\n
     it will check if the permutation yields the claimed objective.\n
     Also asserts dimensions of data and solution file match"""
-
-    (A, B) = dh.file_to_AB(data_file)  # noqa: N806
+    if A is None or B is None:
+        (A, B) = dh.file_to_AB(data_file, cache=cache)  # noqa: N806
     data_n = A.shape[0]
-    (sol_n, claimed_obj_val, permutation) = sol_file_to_info(sol_file)
+    (sol_n, claimed_obj_val, permutation) = sol_file_to_info(sol_file, cache=cache)
     if data_n != sol_n:
         raise Exception('Dimensions of solution and data file do not match')
 
-    obj_val = 0
-    for i, pi in enumerate(permutation):
-        for j, pj in enumerate(permutation):
-            obj_val += A[i][j] *B[pi-1][pj-1]
-
+    # solution files use 1 indexing
+    obj_val = comp_obj_val_perm(perm=np.asarray(permutation) - 1, A=A, B=B)
     return claimed_obj_val == obj_val
 
 
-def sol_file_to_info(sol_file) -> tuple[int, int, list[int]]:
-    """Returns (n, obj_val, permutation)"""
+def sol_file_to_info(sol_file, cache=None) -> tuple[int, int, list[int]]:
+    """Returns (n, obj_val, permutation)\n
+    When cache is given permutation is a read only np.ndarray view into the cache."""
+    if cache is not None:
+        return cache.get_sol(sol_file)
     with open(sol_file) as file:
         all_ints = [int(num) for num in re.findall('[0-9]+', file.read())]
     n = all_ints[0]
@@ -56,34 +66,85 @@ def sol_file_to_info(sol_file) -> tuple[int, int, list[int]]:
     return (n, obj_val, permutation)
 
 
-def check_model(model: gp.Model, data_file: str) -> tuple[bool, str]:
+def check_model(model: gp.Model, data_file: str, cache=None, A=None, B=None,  # noqa: N803, PLR0913, PLR0917
+                obj_val_tol: float = 0.) -> tuple[bool, str]:
     """Given a solved model,\n
-    this function will check if model attains objective it claims"""
-    (A, B) = dh.file_to_AB(data_file)  # noqa: N806
+    this function will check if model attains objective it claims, up to the relative tolerance obj_val_tol.\n
+    When A and B are given the data file is not read."""
+    if A is None or B is None:
+        (A, B) = dh.file_to_AB(data_file, cache=cache)  # noqa: N806
     n = A.shape[0]
     warnings_to_return = ''
     
-    # * define x and check its type
-    # we want: x = model.getVarByName('x'), but that doesn't work
-    # This does work: something = model.getVarByName('x[0,0]')
-    x = gp.tupledict()
-    for i in range(n):
-        for j in range(n):
-            x[i, j] = model.getVarByName(f'x[{i},{j}]')
-            if x[i, j].getAttr(GRB.Attr.VType) != 'B':
-                # raise Exception(f'Variable x[{i},{j}] is not Binary type')
-                # print(f'waring Variable x[{i},{j}] is not Binary type not binary')
-                warnings_to_return += f'waring Variable x[{i},{j}] is not Binary type not binary\n'
+    # * get x and check its type, in bulk
+    x_vars = get_x_vars(model=model, n=n)
+    x_vtypes = model.getAttr(GRB.Attr.VType, x_vars)
+    for (r, vtype) in enumerate(x_vtypes):
+        if vtype != 'B':
+            (i, j) = divmod(r, n)
+            warnings_to_return += f'waring Variable x[{i},{j}] is not Binary type not binary\n'
+    x_val = np.array(model.getAttr(GRB.Attr.X, x_vars)).reshape(n, n)
 
     # * compute real_obj_val
-    real_obj_val = comp_obj_val_naive(x, A, B)
+    perm = x_to_permutation(x_val)
+    if perm is None:
+        return (False, 'x is not a permutation matrix\n' + warnings_to_return)
+    real_obj_val = comp_obj_val_perm(perm=perm, A=A, B=B)
 
     if model.ObjVal == real_obj_val:
         return (True, warnings_to_return)
+    elif obj_vals_match(model.ObjVal, real_obj_val, tol=obj_val_tol):
+        return (True, f'model.ObjVal: {model.ObjVal} is within tolerance of real_obj_val: {real_obj_val}\n' + warnings_to_return)
     else:
         return (False, f'model.ObjVal: {model.ObjVal}, real_obj_val: {real_obj_val}\n' + warnings_to_return)
 
 
+def obj_vals_match(model_obj_val: float, obj_val: float, tol: float) -> bool:
+    """Returns True when model_obj_val equals obj_val up to the relative tolerance tol, tol == 0 is an exact comparison"""
+    return abs(model_obj_val - obj_val) <= tol * max(1., abs(obj_val))
+
+
+def model_obj_val_tol(solving_technique: str, settings) -> float:
+    """Returns the relative tolerance for check_all of a model solved by solving_technique with settings,\n
+    OBJ_VAL_TOL for a dp with init_with_gl and 0 (exact) otherwise."""
+    if solving_technique == 'dp' and settings.init_with_gl:
+        return OBJ_VAL_TOL
+    return 0.
+
+
+def get_x_vars(model: gp.Model, n: int) -> list[gp.Var]:
+    """Returns the variables x[i,j] in row major order,\n
+    all methods add x first, so these are the first n^2 variables, checked by name in one bulk query."""
+    x_names = [f'x[{i},{j}]' for i in range(n) for j in range(n)]
+    x_vars = model.getVars()[:n * n]
+    if model.getAttr(GRB.Attr.VarName, x_vars) == x_names:
+        return x_vars
+    # x was not added first, look up every name
+    return [model.getVarByName(name) for name in x_names]
+
+
+def x_to_permutation(x_val: np.ndarray, tol: float = 1e-5) -> np.ndarray | None:
+    """Returns perm with x_val[i, perm[i]] == 1 (location i gets facility perm[i]),\n
+    or None when x_val is not a permutation matrix up to tol."""
+    rounded = np.round(x_val)
+    if np.abs(x_val - rounded).max() > tol:
+        return None
+    if not (np.all(rounded.sum(axis=0) == 1) and np.all(rounded.sum(axis=1) == 1)):
+        return None
+    return rounded.argmax(axis=1)
+
+
+def comp_obj_val_perm(perm: np.ndarray, A: np.ndarray, B: np.ndarray):  # noqa: N803
+    """Computes the real objective value given the permutation perm, location i gets facility perm[i],\n
+    sum over i, k of A[i][k] * B[perm[i]][perm[k]]."""
+    return (A * B[perm][:, perm]).sum().item()
+
+
+def is_automorphism(perm: np.ndarray, C: np.ndarray) -> bool:  # noqa: N803
+    """Returns True when C[perm[i]][perm[k]] == C[i][k] for all i, k"""
+    return bool(np.array_equal(C[np.ix_(perm, perm)], C))
+
+
 def comp_obj_val_naive(x, A, B):  # noqa: N803
     """Computes the real objective value given x A and B using the naive method\n
     naive method has\n
@@ -117,37 +178,16 @@ def comp_obj_val_adjorn(x, A, B):  # noqa: N803
     return real_obj_val
 
 
-def comp_obj_val_mei(x, A, B):  # noqa: N803
-    """Computes the real objective value given x A and B using Mei's method\n
-    Mei's method has\n
-    pro: less indentation than naive method, quick runtime\n
-    con: more complex
-    """
-    # contains bug # todo fix
-    n = A.shape[0]
-    r = range(n)
-    meis_iter_1 = product(r, r)
-    meis_iter_2 = product(r, r)
-    real_obj_val = 0
-    for loc_1, fac_1 in meis_iter_1:
-        if x[loc_1, fac_1].X == 1:
-            for loc_2, fac_2 in meis_iter_2:
-                if x[loc_2, fac_2].X == 1:
-                    real_obj_val += A[loc_1][loc_2] * B[fac_1][fac_2]
-    
-    return real_obj_val
-
-
 def check_q(q) -> int:
-    """checks if q is np.ndarray,\n
+    """checks if q is np.ndarray or data_handler.FactoredQ,\n
     checks if q.shape == (n, n, n, n)\n
     returns n"""
-    if not isinstance(q, np.ndarray):
-        raise Exception('q is not type np.ndarray')
+    if not isinstance(q, (np.ndarray, dh.FactoredQ)):
+        raise Exception('q is not type np.ndarray or data_handler.FactoredQ')
     n = q.shape[0]
     if q.shape != (n, n, n, n):
         raise Exception('q.shape != (n, n, n, n)')
 
-    if not np.all(q >= 0):
+    if q.min() < 0:
         raise Exception('q has a negative entry')
     return n
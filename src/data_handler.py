@@ -1,5 +1,6 @@
 # ruff: noqa: N806
 import numpy as np
+import scipy.sparse as sp
 import re
 
 
@@ -19,12 +20,109 @@ def generate_random_AB(n=8, lb_cost_A=2, ub_cost_A=10,  # noqa: N803, N802, PLR0
                        lb_cost_B=2, ub_cost_B=10, seed=1) -> tuple[np.ndarray, np.ndarray]:  # noqa: N803
     """returns random (A, B)"""
     np.random.seed(seed=seed)
-    A = np.random.randint(lb_cost_A, ub_cost_A, size=(n, n, n, n))
-    B = np.random.randint(lb_cost_B, ub_cost_B, size=(n, n, n, n))
+    A = np.random.randint(lb_cost_A, ub_cost_A, size=(n, n))
+    B = np.random.randint(lb_cost_B, ub_cost_B, size=(n, n))
     return (A, B)
 
 
-def file_to_q(file_path: str) -> tuple[np.ndarray, str]:
+class FactoredQ:
+    """Cost matrix q of a Koopmans-Beckmann instance stored as its distance and flow matrixes A and B,\n
+    q[loc_1][fac_1][loc_2][fac_2] = A[loc_1][loc_2]*B[fac_1][fac_2] is computed on access, never for all entries at once.\n
+    Supports what the solvers use of a dense q:\n
+    chained indexing q[i][j][k][l], q[i][j] as (n, n) matrix,\n
+    tuples of ints and slices e.g. q[i, j] or q[:, j, k, l],\n
+    tuples of ints and index arrays which broadcast together e.g. q[ks[:, None], perm[:, None], ks, perm],\n
+    q.sum(axis=(2, 3)), q.min(), q.max() and q.shape.\n
+    np.asarray(q) builds the dense (n, n, n, n) matrix."""
+    ndim = 4
+
+    def __init__(self, A: np.ndarray, B: np.ndarray):  # noqa: N803
+        self.A = np.asarray(A)
+        self.B = np.asarray(B)
+        self.n = self.A.shape[0]
+        if self.A.shape != (self.n, self.n) or self.B.shape != (self.n, self.n):
+            raise Exception('check A.shape == (n, n) and B.shape == (n, n) has failed')
+        self.shape = (self.n, self.n, self.n, self.n)
+        self.dtype = np.result_type(self.A, self.B)
+
+    def __getitem__(self, key):
+        if _is_int(key):
+            return _PartialQ(q=self, key=(key,))
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 4:  # noqa: PLR2004
+            raise IndexError('too many indices for FactoredQ')
+        if all(_is_int(k) or isinstance(k, slice) for k in key):
+            return self._basic_index(key)
+        if len(key) == 4 and not any(isinstance(k, slice) for k in key):  # noqa: PLR2004
+            # all ints and index arrays, these broadcast together as for a dense q
+            return self.A[key[0], key[2]] * self.B[key[1], key[3]]
+        raise IndexError('FactoredQ supports ints and slices, or four ints and index arrays')
+
+    def _basic_index(self, key):
+        key = key + (slice(None),) * (4 - len(key))
+        a = self.A[key[0], key[2]]
+        b = self.B[key[1], key[3]]
+        # place the remaining axes of a (loc axes 0, 2) and b (fac axes 1, 3) in the order of q
+        a_dims = list(np.shape(a))
+        b_dims = list(np.shape(b))
+        a_shape = []
+        b_shape = []
+        for axis in range(4):
+            if _is_int(key[axis]):
+                continue
+            if axis in {0, 2}:
+                a_shape.append(a_dims.pop(0))
+                b_shape.append(1)
+            else:
+                a_shape.append(1)
+                b_shape.append(b_dims.pop(0))
+        return np.reshape(a, a_shape) * np.reshape(b, b_shape)
+
+    def sum(self, axis=None):
+        if axis is None:
+            return self.A.sum() * self.B.sum()
+        if tuple(axis) == (2, 3):
+            # sum over k and l of A[i][k]*B[j][l]
+            return np.outer(self.A.sum(axis=1), self.B.sum(axis=1))
+        return np.asarray(self).sum(axis=axis)
+
+    def min(self):
+        extremes = np.outer([self.A.min(), self.A.max()], [self.B.min(), self.B.max()])
+        return extremes.min()
+
+    def max(self):
+        extremes = np.outer([self.A.min(), self.A.max()], [self.B.min(), self.B.max()])
+        return extremes.max()
+
+    def __array__(self, dtype=None, copy=None):  # noqa: ARG002
+        q = AB_to_q(self.A, self.B)
+        return q if dtype is None else q.astype(dtype)
+
+
+class _PartialQ:
+    """q[i], q[i][j] or q[i][j][k] of a FactoredQ, indexing further with an int stays O(1)"""
+    def __init__(self, q: FactoredQ, key: tuple):
+        self.q = q
+        self.key = key
+        self.shape = q.shape[len(key):]
+
+    def __getitem__(self, k):
+        if _is_int(k):
+            key = self.key + (k,)
+            return self.q[key] if len(key) == 4 else _PartialQ(q=self.q, key=key)  # noqa: PLR2004
+        return np.asarray(self)[k]
+
+    def __array__(self, dtype=None, copy=None):  # noqa: ARG002
+        a = self.q[self.key]
+        return a if dtype is None else a.astype(dtype)
+
+
+def _is_int(k) -> bool:
+    return isinstance(k, (int, np.integer)) and not isinstance(k, bool)
+
+
+def file_to_q(file_path: str, dense: bool = False, cache=None) -> tuple[FactoredQ | np.ndarray, str]:
     """Returns (q, instance_name)\n
     Takes file path with format,\n
     \n
@@ -66,11 +164,13 @@ def file_to_q(file_path: str) -> tuple[np.ndarray, str]:
     \n
     Outputs matrixes A and B, which are distance and flow matrixes,\n
     and returns q which is a cost matrix.\n
-    Matrix q is indexed like so q[loc_1][fac_1][loc_2][fac_2].
+    Matrix q is indexed like so q[loc_1][fac_1][loc_2][fac_2].\n
+    q is a FactoredQ, unless dense is True then q is a np.ndarray of shape (n, n, n, n).\n
+    When cache (an instance_cache.InstanceCache) is given A and B are loaded from it.
     """
     instance_name = re.split('[/\\\\]', file_path)[-1]
-    (A, B) = file_to_AB(file_path)
-    q = AB_to_q(A, B)
+    (A, B) = file_to_AB(file_path, cache=cache)
+    q = AB_to_q(A, B) if dense else FactoredQ(A, B)
     return (q, instance_name)
 
 
@@ -85,36 +185,70 @@ def AB_to_q(A: np.ndarray, B: np.ndarray) -> np.ndarray:  # noqa: N802, N803
         raise Exception('check A.shape == (n, n) and B.shape == (n, n) has failed')
 
     # compute q
-    q = np.zeros(shape=(n, n, n, n))
-    for loc_1 in range(n):
-        for fac_1 in range(n):
-            for loc_2 in range(n):
-                for fac_2 in range(n):
-                    q[loc_1][fac_1][loc_2][fac_2] = \
-                        A[loc_1][loc_2]*B[fac_1][fac_2]
+    # q[loc_1][fac_1][loc_2][fac_2] = A[loc_1][loc_2]*B[fac_1][fac_2]
+    q = (A[:, None, :, None] * B[None, :, None, :]).astype(float)
     return q
 
 
-def file_to_AB(file_path: str) -> tuple[np.ndarray, np.ndarray]:  # noqa: N802
+def q_to_sparse_matrix(q) -> sp.csr_matrix:
+    """Returns q as (n^2, n^2) sparse matrix Q with Q[i*n + j, k*n + l] = q[i][j][k][l],\n
+    for a FactoredQ this is kron(A, B) and no dense (n, n, n, n) matrix is build."""
+    n = q.shape[0]
+    if isinstance(q, FactoredQ):
+        return sp.kron(sp.csr_matrix(q.A, dtype=float), sp.csr_matrix(q.B, dtype=float), format='csr')
+    return sp.csr_matrix(np.reshape(q, (n * n, n * n)), dtype=float)
+
+
+def active_pairs(q, exclude_diagonal: bool) -> np.ndarray:
+    """Returns the (n, n) bool matrix with True for the pairs (i, j) that can contribute cost,\n
+    those with q[i][j][k][l] != 0 for some k, l, with exclude_diagonal for some k not i and l not j.\n
+    Computed from the nonzeros of q_to_sparse_matrix, so for a FactoredQ in O(nnz(A) * nnz(B))."""
+    n = q.shape[0]
+    Q = q_to_sparse_matrix(q).tocoo()
+    keep = Q.data != 0
+    if exclude_diagonal:
+        (i, j) = np.divmod(Q.row, n)
+        (k, l) = np.divmod(Q.col, n)  # noqa: E741
+        keep &= (i != k) & (j != l)
+    return (np.bincount(Q.row[keep], minlength=n * n) > 0).reshape(n, n)
+
+
+def file_to_AB(file_path: str, cache=None) -> tuple[np.ndarray, np.ndarray]:  # noqa: N802
+    """Returns (A, B) of the instance file, see file_to_q for the format.\n
+    When cache (an instance_cache.InstanceCache) is given, A and B are read only views into the cache,\n
+    otherwise the file is parsed."""
+    if cache is not None:
+        return cache.get_AB(file_path)
+    return parse_AB(file_path)
+
+
+def parse_AB(file_path: str) -> tuple[np.ndarray, np.ndarray]:  # noqa: N802
     with open(file_path) as file:
         text = file.read()
-    # get list of all numbers in file
-    num_list = re.sub(r'[\r\n ]+', ' ', text.rstrip()).split()
-    # map to int
-    num_list = list(map(int, num_list))
+    # get array of all numbers in file, any whitespace separates
+    num_arr = np.fromstring(text, dtype=np.int64, sep=' ')
 
-    file_n = num_list[0]
+    file_n = int(num_arr[0])
 
-    if len(num_list) < 2 * file_n ** 2 + 1:
+    if len(num_arr) < 2 * file_n ** 2 + 1:
         raise Exception('num_list contains less entries than expected')
-    elif len(num_list) > 2 * file_n ** 2 + 1:
+    elif len(num_arr) > 2 * file_n ** 2 + 1:
         raise Exception('num_list contains more entries than expected')
 
-    A = np.array(num_list[1:file_n ** 2 + 1]).reshape((file_n, file_n))
-    B = np.array(num_list[file_n ** 2 + 1: 2 * file_n ** 2 + 1]).reshape((file_n, file_n))
+    A = num_arr[1:file_n ** 2 + 1].reshape((file_n, file_n))
+    B = num_arr[file_n ** 2 + 1: 2 * file_n ** 2 + 1].reshape((file_n, file_n))
     return (A, B)
 
 
+def AB_to_file(A: np.ndarray, B: np.ndarray, file_path: str) -> None:  # noqa: N802, N803
+    """Writes matrixes A and B to file_path in the format read by file_to_AB"""
+    n = A.shape[0]
+    with open(file_path, 'w') as file:
+        file.write(f'{n}\n\n')
+        file.write('\n'.join(' '.join(str(a) for a in row) for row in A) + '\n\n')
+        file.write('\n'.join(' '.join(str(b) for b in row) for row in B) + '\n')
+
+
 def str_to_matrix(string: str) -> np.ndarray:
     arr = np.fromstring(string, dtype=int, sep=' ')
     n = int(np.sqrt(len(arr)))
@@ -34,6 +34,17 @@
 # * initialization
 # upon function call specification add
 # kbl cuts, or xy cuts to model.
+# * xy cuts
+# for q[i][j][k][l] = A[i][k] * B[j][l] (see add_xy_constrs),
+# w[i,j] = sum {k not i} A[i][k] * x[i,j] * z[j,k] with z[j,k] = sum {l not j} B[j][l] * x[k,l]
+# the flow of facility j to the facility at location k. Given x[i,j] == 1, lo[j] <= z[j,k] <= hi[j]
+# for k not i, with lo[j] and hi[j] the minimum and maximum of B[j][l] over l not j,
+# so the products y[i,j,k] = x[i,j] * z[j,k] are linearized by
+# y[i,j,k] >= z[j,k] - hi[j] * (1 - x[i,j]),  y[i,j,k] >= lo[j] * x[i,j]     if A[i][k] > 0,
+# y[i,j,k] <= z[j,k] - lo[j] * (1 - x[i,j]),  y[i,j,k] <= hi[j] * x[i,j]     if A[i][k] < 0,
+# w[i,j] >= sum {k not i} A[i][k] * y[i,j,k]                                 for all i, j,
+# with y only for A[i][k] != 0. This is O(n^3) variables, constraints and nonzeros,
+# against O(n^4) nonzeros of the kbl cuts, and exact for binary x.
 
 # # * gurobi code
 # note uses zero indexing
@@ -43,29 +54,59 @@ from settings import SettingsDP
 import numpy as np
 import gurobipy as gp
 from gurobipy import GRB
+import scipy.sparse as sp
 import checker as ch
+import data_handler as dh
 import kaufman_broeckx as kbl
+from network_flow import SubProblemFlowDP
+from tracing import Tracer
+import telemetry as tm
+import heuristics as hr
+import bounds as bd
+import symmetry as sy
 from time import time
+import multiprocessing as mp
+import hashlib
+from itertools import groupby
 
 
 class DisjunctiveProgrammingMethod:
     def __init__(self, q, settings: SettingsDP):
+        build_start = time()
         self.q = q
         self.settings = settings
         self.check_settings()
         self.n = ch.check_q(q=q)
+        # pairs (i, j) whose subproblem has a nonzero objective, the others have w_bar == 0 and are never separated
+        self.active = dh.active_pairs(q=q, exclude_diagonal=True)
+        self.tracer = Tracer(enabled=self.settings.trace, record_events=self.settings.trace_events)
 
         self.model = gp.Model('Disjunctive-Programming')
-        self.add_variables()
-        self.add_constraints()
-        self.set_objective()
-        self.init_with()
+        self.model._tracer = self.tracer
+        with self.tracer.span('build/add_variables'):
+            self.add_variables()
+        with self.tracer.span('build/add_constraints'):
+            self.add_constraints()
+        with self.tracer.span('build/set_objective'):
+            self.set_objective()
+        with self.tracer.span('build/init_with'):
+            self.init_with()
+        with self.tracer.span('build/update'):
+            self.model.update()
+        self.model._build_time = time() - build_start
 
         self.set_time_limit()
         self.set_threads()
         self.set_soft_mem_limit()
+        with self.tracer.span('build/heuristic'):
+            self.set_heuristic_start()
 
         self.prepare_callback()
+        self.sp_pool = SubProblemPoolDP(q=q, sp_solver=self.settings.sp_solver,
+                                        reuse=self.settings.reuse_subproblems, gp_sp_output=False, tracer=self.tracer,
+                                        max_size=self.settings.max_reused_subproblems)
+        with self.tracer.span('build/start_worker_pool'):
+            self.start_worker_pool()
         if self.settings.pre_crush:
             self.model.Params.PreCrush = 1
         
@@ -79,6 +120,10 @@ class DisjunctiveProgrammingMethod:
         
         self.w = self.model.addVars(self.n, self.n, vtype=GRB.CONTINUOUS, name='w', lb=0)
 
+        # flat (row major) lists of x and w, used to query all callback values at once
+        self.x_list = [self.x[i, j] for i in range(self.n) for j in range(self.n)]
+        self.w_list = [self.w[i, j] for i in range(self.n) for j in range(self.n)]
+
     def add_constraints(self):
         # * x in X_n^=
         self.model.addConstrs((gp.quicksum(
@@ -87,28 +132,57 @@ class DisjunctiveProgrammingMethod:
         self.model.addConstrs((gp.quicksum(
             self.x[i, j] for j in range(self.n)) == 1 for i in range(self.n)),
             name='constr_sum_1_for_all_i')
+        self.symmetry = sy.add_symmetry_breaking_constrs(model=self.model, x=self.x, q=self.q, settings=self.settings)
 
     def init_with(self):
-        """Initializes with KBL constraints and XY constraints depending on self.settings"""
+        """Initializes with KBL, Gilmore-Lawler and XY constraints depending on self.settings"""
         if self.settings.init_with_kbl and self.settings.init_with_xy:
             print('!\n!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
             print('warning initializing with both kbl and xy is discouraged')
             print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!\n!')
 
         if self.settings.init_with_kbl:
-            M = kbl.compute_M(q=self.q)  # noqa: N806
-            # todo make M tighter given w of dp is without q[i][j][i][j] * x[i][j]
-
-            self.model.addConstrs((self.w[i, j] >= gp.quicksum(
-                self.q[i][j][k][l] * self.x[k, l] - M[i][j] * (1 - self.x[i, j])
-                for k in range(self.n) if k != i for l in range(self.n) if l != j)
-                for i in range(self.n) for j in range(self.n)),
-                name='constr_on_w_for_all_ij')
+            M = bd.big_m(q=self.q, method=self.settings.big_m, exclude_diagonal=True)  # noqa: N806
+
             # note in sum k!=i and l!=j since w of dp is without q[i][j][i][j] * x[i][j]
+            Q = dh.q_to_sparse_matrix(self.q).tocoo()  # noqa: N806
+            (i, j) = np.divmod(Q.row, self.n)
+            (k, l) = np.divmod(Q.col, self.n)
+            keep = (i != k) & (j != l)
+            Q = sp.csr_matrix((Q.data[keep], (Q.row[keep], Q.col[keep])), shape=Q.shape)  # noqa: N806
+
+            kbl.add_w_constrs(model=self.model, x_list=self.x_list, w_list=self.w_list,
+                              Q=Q, M=M, name='constr_on_w_for_all_ij')
         
+        if self.settings.init_with_gl:
+            # w[i,j] - GL[i,j] * x[i,j] >= 0 for all i,j with GL[i,j] > 0, the other rows are implied by w >= 0
+            GL = bd.gilmore_lawler_bounds(q=self.q).ravel()  # noqa: N806
+            rows = np.flatnonzero(GL > 0)
+            coef = sp.hstack([-sp.diags(GL), sp.identity(self.n * self.n)], format='csr')[rows]
+            constrs = self.model.addMConstr(coef, gp.MVar.fromlist(self.x_list + self.w_list),
+                                            GRB.GREATER_EQUAL, np.zeros(rows.shape[0])).tolist()
+            self.model.setAttr(GRB.Attr.ConstrName, constrs,
+                               [f'constr_gl_on_w_for_all_ij[{i},{j}]' for (i, j) in zip(*np.divmod(rows, self.n))])
+
         if self.settings.init_with_xy:
-            # todo implement
-            raise Exception('init_with_xy not implemented yet')
+            if not isinstance(self.q, dh.FactoredQ):
+                raise ValueError('init_with_xy needs q as FactoredQ (A and B)')
+            (self.z, self.y) = add_xy_constrs(model=self.model, x_list=self.x_list, w_list=self.w_list,
+                                              A=self.q.A, B=self.q.B, name='constr_xy')
+
+    def set_heuristic_start(self):
+        """Sets the permutation of the heuristic as mip start, w is started at its subproblem values,\n
+        so the start satisfies all benders cuts and is not rejected by the lazy constraint callback."""
+        perm = hr.set_heuristic_start(model=self.model, x=self.x, q=self.q,
+                                      time_limit=self.settings.heuristic_time_limit,
+                                      cutoff=self.settings.heuristic_cutoff, seed=self.settings.heuristic_seed,
+                                      symmetry=self.symmetry)
+        if perm is None:
+            return
+        w_bar_val = permutation_w_bar(q=self.q, perm=perm)
+        for i in range(self.n):
+            for j in range(self.n):
+                self.w[i, j].Start = w_bar_val[i, j]
 
     def set_objective(self):
         self.model.ModelSense = GRB.MINIMIZE
@@ -116,7 +190,7 @@ class DisjunctiveProgrammingMethod:
             (self.w[i, j] + self.q[i][j][i][j] * self.x[i, j])
             for i in range(self.n) for j in range(self.n)))
         
-    def benders_callback(self, do_not_use_model, where):  # noqa: ARG002, C901
+    def benders_callback(self, do_not_use_model, where):  # noqa: ARG002
         """Instead of specifying the model via the function input use self.model"""
         # only run code at specified callback
         self.model._callback_call_count += 1
@@ -133,53 +207,68 @@ class DisjunctiveProgrammingMethod:
         
         self.model._benders_started_count += 1
         start_timer = time()
+        with self.tracer.span('callback'):
+            self.run_benders_callback(start_timer=start_timer)
+
+    def run_benders_callback(self, start_timer: float):  # noqa: C901
+        """Body of benders_callback, separates (x_hat, w_hat) and adds the cuts"""
         # since benders call is made main problem variables
         # self.x and self.w are the subproblem x_hat and w_hat
         # x_hat = self.x
         # w_hat = self.w
-        x_hat_val = gp.tupledict()
-        for i in range(self.n):
-            for j in range(self.n):
-                x_hat_val[i, j] = self.cb_get_solution(self.x[i, j])
-        
-        w_hat_val = gp.tupledict()
-        for i in range(self.n):
-            for j in range(self.n):
-                w_hat_val[i, j] = self.cb_get_solution(self.w[i, j])
-
-        w_bar_val = gp.tupledict()
-        # todo make loop smarter
+        with self.tracer.span('callback/get_solution'):
+            x_hat_val = np.array(self.cb_get_solution(self.x_list)).reshape(self.n, self.n)
+            w_hat_val = np.array(self.cb_get_solution(self.w_list)).reshape(self.n, self.n)
+
+        perm = ch.x_to_permutation(x_hat_val) if self.settings.integral_fast_path else None
+        if perm is not None:
+            with self.tracer.span('callback/separate_integral'):
+                separation = self.separate_integral(perm=perm, w_hat_val=w_hat_val)
+        else:
+            with self.tracer.span('callback/separate'):
+                separation = self.separate(x_hat_val=x_hat_val, w_hat_val=w_hat_val, pairs=self.pairs)
+
+        with self.tracer.span('callback/score_cuts'):
+            (candidates, rejected) = self.score_cuts(separation=separation, w_hat_val=w_hat_val)
+        cut_aggregation = self.cut_aggregation_at_callback()
+        if cut_aggregation != DPS.MULTI_CUT:
+            with self.tracer.span('callback/aggregate_cuts'):
+                candidates = self.aggregate_cuts(candidates=candidates, rejected=rejected,
+                                                 w_hat_val=w_hat_val, cut_aggregation=cut_aggregation)
         cuts_added_this_callback = 0
-        for i in range(self.n):
-            for j in range(self.n):
-                spdp = self.solve_subproblem(x_hat_val=x_hat_val, i=i, j=j)
-
-                w_bar_val[i, j] = spdp.model.ObjVal
-                
-                if self.settings.debug_print_cut_info and -w_hat_val[i, j] + w_bar_val[i, j] > 0:
-                    print(f'------debug_print_cut_info for (i,j): ({i},{j})------')
-                    print(f'-w_hat_val[i, j] + w_bar_val[i, j] = {-w_hat_val[i, j] + w_bar_val[i, j]}')
-                    print(f'w_hat_val[i, j]: {w_hat_val[i, j]}')
-                    print(f'w_bar_val[i, j]: {w_bar_val[i, j]}')
-                    print('spdp.x_1:\n', spdp.x_1)
-                    print('spdp.x_hat_val:\n', spdp.x_hat_val)
-                    print()
-                
-                if w_hat_val[i, j] < w_bar_val[i, j] - self.settings.minimum_w_difference:
-                    # (x_hat, w_hat[i,j]) is not in P_{i,j}
-                    # Add Benders cut to the main problem
-                    self.add_benders_cut(spdp)
-                    cuts_added_this_callback += 1
-                    self.model._total_num_cuts += 1
-                    self.model._cut_info.append((self.model._total_num_cuts,
-                                                 self.model._benders_started_count,
-                                                  -w_hat_val[i, j] + w_bar_val[i, j],
+        cut_pool_hits_this_callback = 0
+        for (i, j, w_bar_val, cut_coef, rel_violation, efficacy, members) in candidates:
+            # (x_hat, w_hat[i,j]) is not in P_{i,j}, for an aggregated cut this holds for all its members
+            if cuts_added_this_callback == self.settings.max_cuts_per_callback and cut_aggregation == DPS.MULTI_CUT:
+                rejected.append((i, j, w_bar_val, rel_violation, efficacy))
+                continue
+            if self.cut_pool is not None:
+                with self.tracer.span('callback/cut_pool'):
+                    is_new = self.cut_pool.add(i=i, j=j, cut_coef=pool_coefficients(cut_coef=cut_coef, members=members))
+                if not is_new:
+                    cut_pool_hits_this_callback += 1
+                    # lazy constraints must be added again, gurobi may pass solutions violating earlier lazy constraints
+                    if self.settings.bd_constr_type == DPS.USER_CUT:
+                        continue
+            # Add Benders cut to the main problem
+            self.add_benders_cut(i=i, j=j, cut_coef=cut_coef, members=members)
+            cuts_added_this_callback += 1
+            self.model._total_num_cuts += 1
+            self.model._cut_info.append((self.model._total_num_cuts,
+                                         self.model._benders_started_count,
+                                          -sum(w_hat_val[k, l] for (k, l) in members) + w_bar_val,
+                                          i,
+                                          j))
+
+        for (i, j, w_bar_val, rel_violation, efficacy) in rejected:
+            self.model._total_num_rejected_cuts += 1
+            self.model._rejected_cut_info.append((self.model._total_num_rejected_cuts,
+                                                  self.model._benders_started_count,
+                                                  -w_hat_val[i, j] + w_bar_val,
+                                                  rel_violation,
+                                                  efficacy,
                                                   i,
                                                   j))
-                else:
-                    # (x_hat, w_hat[i,j]) is in P_{i,j}
-                    # no cut to be added
-                    pass
         
         stop_timer = time()
         time_spent_in_this_cb = stop_timer - start_timer
@@ -190,50 +279,146 @@ class DisjunctiveProgrammingMethod:
             self.model._callback_call_count,
             cuts_added_this_callback,
             time() - self.init_time,
-            time_spent_in_this_cb))
-
-    def solve_subproblem(self, x_hat_val, i, j):
-        spdp = SubProblemDP(x_hat_val=x_hat_val, i=i, j=j, q=self.q, gp_sp_output=False)
-        spdp.model.optimize()
-        # if spdp.model.Status != 2: # todo add propper error handeling and writing to logfile when subproblem is not solved till optimality
-        #     raise Exception('subproblem was not solved till optimality')
-        return spdp
-
-    def add_benders_cut(self, spdp):  # noqa: C901
-        # let lamb, theta, phi, be dual multipliers of constraints 1, 2, 3 respectively
-        theta = {}
-        for l in range(self.n):
-            if l != spdp.j:
-                theta[l] = spdp.model.getConstrByName(f'spdp_constr_2-l={l}').Pi
-
-        phi = {}
-        for k in range(self.n):
-            if k != spdp.i:
-                phi[k] = spdp.model.getConstrByName(f'spdp_constr_3-k={k}').Pi
-        
-        lamb = gp.tupledict()
-        for k in range(self.n):
-            if k != spdp.i:
-                for l in range(self.n):
-                    if l != spdp.j:
-                        lamb[k, l] = spdp.model.getConstrByName(f'spdp_constr_1-k={k}_l={l}').Pi
-
+            time_spent_in_this_cb,
+            cut_pool_hits_this_callback,
+            len(rejected)))
+
+    def score_cuts(self, separation: list[tuple[int, int, float, np.ndarray]], w_hat_val: np.ndarray) -> tuple[list, list]:
+        """Scores the violated pairs of separation by relative violation and efficacy (see cut_scores),\n
+        returns (candidates, rejected) where candidates is a list of (i, j, w_bar_val, cut_coef, rel_violation, efficacy, members)\n
+        with members == [(i, j)] the w in the cut, sorted by decreasing efficacy,\n
+        and rejected is a list of (i, j, w_bar_val, rel_violation, efficacy)\n
+        of the cuts below min_relative_violation or min_efficacy."""
+        candidates = []
+        rejected = []
+        for (i, j, w_bar_val, cut_coef) in separation:
+            if cut_coef is None:
+                # (x_hat, w_hat[i,j]) is in P_{i,j}
+                # no cut to be added
+                continue
+            (rel_violation, efficacy) = cut_scores(w_hat_val=w_hat_val[i, j], w_bar_val=w_bar_val, cut_coef=cut_coef)
+            if rel_violation < self.settings.min_relative_violation or efficacy < self.settings.min_efficacy:
+                rejected.append((i, j, w_bar_val, rel_violation, efficacy))
+            else:
+                candidates.append((i, j, w_bar_val, cut_coef, rel_violation, efficacy, [(i, j)]))
+        candidates.sort(key=lambda candidate: candidate[5], reverse=True)
+        return (candidates, rejected)
+
+    def cut_aggregation_at_callback(self) -> DPS:
+        """Returns the cut aggregation of this callback, DPS.HYBRID_CUT is DPS.MULTI_CUT until the cut pool\n
+        (or without cut pool the number of added cuts) holds hybrid_cut_threshold cuts and DPS.SINGLE_CUT after."""
+        if self.settings.cut_aggregation != DPS.HYBRID_CUT:
+            return self.settings.cut_aggregation
+        num_cuts = self.cut_pool.size() if self.cut_pool is not None else self.model._total_num_cuts
+        return DPS.MULTI_CUT if num_cuts < self.settings.hybrid_cut_threshold else DPS.SINGLE_CUT
+
+    def aggregate_cuts(self, candidates: list, rejected: list, w_hat_val: np.ndarray, cut_aggregation: DPS) -> list:
+        """Sums the candidates (see score_cuts) into one cut for all, per row i or per column j,\n
+        sum {(i,j) in members} w[i,j] >= sum {(i,j) in members} cut of (i,j), which is violated by the sum of the violations.\n
+        At most max_cuts_per_callback candidates are summed, the rest is appended to rejected.\n
+        Returns the aggregated cuts as candidates with i == -1 or j == -1 for the summed index,\n
+        their relative violation and efficacy are computed for the summed cut."""
+        if self.settings.max_cuts_per_callback != -1:
+            for (i, j, w_bar_val, _, rel_violation, efficacy, _) in candidates[self.settings.max_cuts_per_callback:]:
+                rejected.append((i, j, w_bar_val, rel_violation, efficacy))
+            candidates = candidates[:self.settings.max_cuts_per_callback]
+        groups = {}
+        for candidate in candidates:
+            key = aggregation_key(cut_aggregation=cut_aggregation, i=candidate[0], j=candidate[1])
+            groups.setdefault(key, []).append(candidate)
+        aggregated = []
+        for ((i, j), group) in groups.items():
+            if len(group) == 1:
+                aggregated.append(group[0])
+                continue
+            members = [(candidate[0], candidate[1]) for candidate in group]
+            w_bar_val = sum(candidate[2] for candidate in group)
+            cut_coef = sum(candidate[3] for candidate in group)
+            (rel_violation, efficacy) = cut_scores(w_hat_val=sum(w_hat_val[k, l] for (k, l) in members),
+                                                   w_bar_val=w_bar_val, cut_coef=cut_coef, num_w=len(members))
+            aggregated.append((i, j, w_bar_val, cut_coef, rel_violation, efficacy, members))
+        return aggregated
+
+    def separate(self, x_hat_val: np.ndarray, w_hat_val: np.ndarray,
+                 pairs: list[tuple[int, int]]) -> list[tuple[int, int, float, np.ndarray]]:
+        """Solves the subproblems of the given pairs (i, j), in the worker pool when it exists,\n
+        returns a list of (i, j, w_bar_val, cut_coef), see separate_pairs."""
+        if self.worker_pool is None:
+            return separate_pairs(sp_pool=self.sp_pool, x_hat_val=x_hat_val, w_hat_val=w_hat_val,
+                                  pairs=pairs, settings=self.settings)
+        chunks = self.pair_chunks if pairs is self.pairs else [
+            pairs[c::self.settings.sp_workers] for c in range(min(self.settings.sp_workers, len(pairs)))]
+        results = self.worker_pool.starmap(_separate_pairs_in_worker,
+                                           [(x_hat_val, w_hat_val, chunk) for chunk in chunks])
+        return [result for chunk_results in results for result in chunk_results]
+
+    def separate_integral(self, perm: np.ndarray, w_hat_val: np.ndarray) -> list[tuple[int, int, float, np.ndarray]]:
+        """Separation when x_hat is the permutation matrix of perm (x_hat[i, perm[i]] == 1),\n
+        then w_bar[i,j] is 0 when perm[i] != j and sum {k in [n] k not i} q[i][j][k][perm[k]] otherwise.\n
+        All w_bar are computed at once, only violated pairs get a cut (analytic or from the subproblem solver).\n
+        Returns a list of (i, j, w_bar_val, cut_coef) for the violated pairs only."""
+        w_bar_val = permutation_w_bar(q=self.q, perm=perm)
+        violated = [(i, int(perm[i])) for i in range(self.n)
+                    if self.active[i, perm[i]]
+                    and w_hat_val[i, perm[i]] < w_bar_val[i, perm[i]] - self.settings.minimum_w_difference]
+        if not violated:
+            return []
+
+        if self.settings.analytic_duals:
+            with self.tracer.span('subproblem/analytic_duals'):
+                return [(i, j, w_bar_val[i, j], analytic_cut_coefficients(q=self.q, perm=perm, i=i, j=j))
+                        for (i, j) in violated]
+
+        x_hat_val = np.zeros((self.n, self.n))
+        x_hat_val[np.arange(self.n), perm] = 1.
+        return self.separate(x_hat_val=x_hat_val, w_hat_val=w_hat_val, pairs=violated)
+
+    def start_worker_pool(self):
+        """Starts self.settings.sp_workers processes that each hold q and their own SubProblemPoolDP,\n
+        the active pairs (i, j) are split into one chunk per row i."""
+        self.pairs = [(int(i), int(j)) for (i, j) in zip(*np.nonzero(self.active))]
+        self.pair_chunks = [list(chunk) for (_, chunk) in groupby(self.pairs, key=lambda pair: pair[0])]
+        self.worker_pool = None
+        if self.settings.sp_workers == 0:
+            return
+        # spawn instead of fork, forking a process that holds a gurobi environment is unsafe
+        self.worker_pool = mp.get_context('spawn').Pool(
+            processes=self.settings.sp_workers,
+            initializer=_init_separation_worker,
+            initargs=(self.q, self.settings))
+
+    def dispose(self):
+        """Frees the subproblems, stops the worker pool and flushes the telemetry"""
+        self.sp_pool.dispose()
+        self.model._callback_info.flush()
+        self.model._cut_info.flush()
+        self.model._rejected_cut_info.flush()
+        if self.worker_pool is not None:
+            self.worker_pool.terminate()
+            self.worker_pool.join()
+            self.worker_pool = None
+
+    def add_benders_cut(self, i: int, j: int, cut_coef: np.ndarray, members: list[tuple[int, int]] | None = None):
         # adding the cut
         # w[i,j] >= sum {l in [n] l not j} theta[l] * x[i,j] +
         #           sum {k in [n] k not i} phi[k] * x[i,j] +
         #           sum {k in [n] k not i} sum {l in [n] l not j} lamb[k,l] * x[k,l]
+        # where cut_coef[i, j] holds the summed theta and phi and cut_coef[k, l] holds lamb[k,l]
+        # an aggregated cut has sum {(k,l) in members} w[k,l] as left hand side and the summed cut_coef (see aggregate_cuts)
 
         # create short hand for left hand side and right hand side of cut
-        lhs = gp.LinExpr(self.w[spdp.i, spdp.j])
-        rhs = gp.LinExpr(
-            gp.quicksum(theta[l] for l in range(self.n) if l != spdp.j) * self.x[spdp.i, spdp.j] +
-            gp.quicksum(phi[k] for k in range(self.n) if k != spdp.i) * self.x[spdp.i, spdp.j] +
-            gp.quicksum(lamb[k, l] * self.x[k, l] for k in range(self.n) if k != spdp.i
-                        for l in range(self.n) if l != spdp.j))
+        # only nonzero coefficients are added to the right hand side
+        with self.tracer.span('cut/linexpr'):
+            members = [(i, j)] if members is None else members
+            lhs = gp.LinExpr([1.] * len(members), [self.w[k, l] for (k, l) in members])
+            cut_coef_flat = cut_coef.ravel()
+            nonzero = np.flatnonzero(cut_coef_flat)
+            rhs = gp.LinExpr(cut_coef_flat[nonzero].tolist(), [self.x_list[r] for r in nonzero])
         
         # add constraint
         if self.settings.debug_add_benders_cuts:
-            self.cb_add_bd_constr(lhs >= rhs)
+            with self.tracer.span('cut/cb_add'):
+                self.cb_add_bd_constr(lhs >= rhs)
         
         # store constraint for debugging
         if self.settings.debug_benders_cuts:
@@ -261,9 +446,21 @@ class DisjunctiveProgrammingMethod:
         self.model._callback_call_count = 0
         self.model._benders_started_count = 0
         self.model._total_time_in_user_cb = 0
-        self.model._callback_info = []
+        self.telemetry_prefix = tm.telemetry_file_prefix(telemetry_dir=self.settings.telemetry_dir,
+                                                         model_name=self.model.ModelName)
+        self.model._callback_info = self.new_telemetry_buffer(table_name='callback_info', columns=tm.CALLBACK_INFO_COLUMNS)
         self.model._total_num_cuts = 0
-        self.model._cut_info = []
+        self.model._cut_info = self.new_telemetry_buffer(table_name='cut_info', columns=tm.CUT_INFO_COLUMNS)
+        self.model._total_num_rejected_cuts = 0
+        self.model._rejected_cut_info = self.new_telemetry_buffer(table_name='rejected_cut_info',
+                                                                  columns=tm.REJECTED_CUT_INFO_COLUMNS)
+        self.cut_pool = BendersCutPool(decimals=self.settings.cut_pool_decimals) if self.settings.cut_pool else None
+        self.model._cut_pool = self.cut_pool
+
+    def new_telemetry_buffer(self, table_name: str, columns: list[tuple[str, type]]) -> tm.TelemetryBuffer:
+        return tm.TelemetryBuffer(file_path=f'{self.telemetry_prefix}_{table_name}.bin', columns=columns,
+                                  capacity=self.settings.telemetry_capacity,
+                                  flush_interval=self.settings.telemetry_flush_interval)
 
     def set_callback_at(self):
         if self.settings.callback_at == DPS.ALL_MIPSOLS:
@@ -327,6 +524,22 @@ class DisjunctiveProgrammingMethod:
         at this moment the only setting being checked by this function is if the """
         if self.settings.minimum_w_difference < 0:
             raise ValueError(f'Minimum bender decomposition cut violation should not be negative. Hoever, it is set to {self.settings.minimum_w_difference}')
+        if self.settings.cut_pool_decimals < 0:
+            raise ValueError(f'cut_pool_decimals setting should not be negative. However, it is set to {self.settings.cut_pool_decimals}')
+        if self.settings.telemetry_capacity < 1:
+            raise ValueError(f'telemetry_capacity setting should be positive. However, it is set to {self.settings.telemetry_capacity}')
+        if self.settings.max_reused_subproblems != -1 and self.settings.max_reused_subproblems < 1:
+            raise ValueError(f'max_reused_subproblems setting is < 1 and not -1, it is set to {self.settings.max_reused_subproblems}')
+        if self.settings.sp_workers < 0:
+            raise ValueError(f'sp_workers setting should not be negative. However, it is set to {self.settings.sp_workers}')
+        if self.settings.min_relative_violation < 0 or self.settings.min_efficacy < 0:
+            raise ValueError(f'min_relative_violation and min_efficacy settings should not be negative. However, they are set to {self.settings.min_relative_violation} and {self.settings.min_efficacy}')
+        if self.settings.max_cuts_per_callback != -1 and self.settings.max_cuts_per_callback < 1:
+            raise ValueError(f'max_cuts_per_callback setting is < 1 and not -1, it is set to {self.settings.max_cuts_per_callback}')
+        if self.settings.cut_aggregation not in {DPS.MULTI_CUT, DPS.SINGLE_CUT, DPS.ROW_CUT, DPS.COLUMN_CUT, DPS.HYBRID_CUT}:
+            raise ValueError('cut_aggregation setting is not DPS.MULTI_CUT, DPS.SINGLE_CUT, DPS.ROW_CUT, DPS.COLUMN_CUT or DPS.HYBRID_CUT')
+        if self.settings.hybrid_cut_threshold < 0:
+            raise ValueError(f'hybrid_cut_threshold setting should not be negative. However, it is set to {self.settings.hybrid_cut_threshold}')
 
 
 class SubProblemDP:
@@ -338,14 +551,19 @@ class SubProblemDP:
     # x_1[k,l] <= x_hat[k,l]                            for all k \in [n] k not i, l \in [n] l not j,   (constr 1)
     # sum {k \in [n] k not i} x_1[k,l] == x_hat[i,j]    for all l \in [n] l not j,                      (constr 2)
     # sum {l \in [n] l not j} x_1[k,l] == x_hat[i,j]    for all k \in [n] k not i.                      (constr 3)
-    def __init__(self, x_hat_val, i: int, j: int, q: np.ndarray, gp_sp_output: bool):  # noqa: PLR0913
+    def __init__(self, x_hat_val, i: int, j: int, q: np.ndarray, gp_sp_output: bool, env: gp.Env = None):  # noqa: PLR0913, PLR0917
         self.x_hat_val = x_hat_val
         self.i = i
         self.j = j
         self.q = q
         self.n = q.shape[0]
+        # the k's and l's appearing in the subproblem
+        self.ks = np.array([k for k in range(self.n) if k != self.i])
+        self.ls = np.array([l for l in range(self.n) if l != self.j])
 
-        if gp_sp_output:
+        if env is not None:
+            self.model = gp.Model('Sub-Problem-DP', env=env)
+        elif gp_sp_output:
             self.model = gp.Model('Sub-Problem-DP')
         else:
             sp_env = gp.Env(empty=True)
@@ -357,8 +575,13 @@ class SubProblemDP:
         self.add_constraints()
         self.set_objective()
 
+        # all constraints in the order constr 1, constr 2, constr 3,
+        # used for updating right hand sides and reading duals in bulk
+        self.constrs = list(self.constr_1.values()) + list(self.constr_2.values()) + list(self.constr_3.values())
+
     def add_variables(self):
         self.x_1 = gp.tupledict()
+        self.constr_1 = gp.tupledict()
         for k in range(self.n):
             for l in range(self.n):
                 if k != self.i and l != self.j:     # avoids creating unnecessary x_1 variables
@@ -366,21 +589,24 @@ class SubProblemDP:
                     self.x_1[k, l] = self.model.addVar(vtype=GRB.CONTINUOUS,
                         name=f'x_1[{k},{l}]', lb=0) # , ub=self.x_hat_val[k, l])
                     # add upper bond as constraint
-                    self.model.addConstr(self.x_1[k, l] <= self.x_hat_val[k, l], name=f'spdp_constr_1-k={k}_l={l}')
+                    self.constr_1[k, l] = self.model.addConstr(
+                        self.x_1[k, l] <= self.x_hat_val[k, l], name=f'spdp_constr_1-k={k}_l={l}')
 
     def add_constraints(self):
         # (const 1) is covered by variable bound
         # sum {k \in [n] k not i} x_1[k,l] == x_hat[i,j]    for all l \in [n] l not j,  (constr 2)
+        self.constr_2 = {}
         for l in range(self.n):
             if l != self.j:
-                self.model.addConstr(gp.quicksum(
+                self.constr_2[l] = self.model.addConstr(gp.quicksum(
             self.x_1[k, l] for k in range(self.n) if k != self.i) == self.x_hat_val[self.i, self.j],
             name=f'spdp_constr_2-l={l}')
                 
         # sum {l \in [n] l not j} x_1[k,l] == x_hat[i,j]    for all k \in [n] k not i.  (constr 3)
+        self.constr_3 = {}
         for k in range(self.n):
             if k != self.i:
-                self.model.addConstr(gp.quicksum(
+                self.constr_3[k] = self.model.addConstr(gp.quicksum(
             self.x_1[k, l] for l in range(self.n) if l != self.j) == self.x_hat_val[self.i, self.j],
             name=f'spdp_constr_3-k={k}')
 
@@ -388,11 +614,318 @@ class SubProblemDP:
         # objective min
         #   sum {k \in [n] k not i} sum {l \in [n] l not j}
         #   q[i][j][k][l] * x_1[k,l]
+        # only the nonzero q[i][j][k][l] are added
+        q_ij = np.asarray(self.q[self.i][self.j], dtype=float)
         self.model.ModelSense = GRB.MINIMIZE
         self.model.setObjective(gp.quicksum(
-            self.q[self.i][self.j][k][l] * self.x_1[k, l]
-            for k in range(self.n) if k != self.i
-            for l in range(self.n) if l != self.j))
+            q_ij[k, l] * self.x_1[k, l]
+            for k in self.ks.tolist()
+            for l in self.ls.tolist() if q_ij[k, l] != 0))
+
+    def update_x_hat(self, x_hat_val):
+        """Sets the right hand sides of constr 1, 2 and 3 to the new x_hat_val,\n
+        the model is not rebuild so the next optimize warm starts from the previous basis."""
+        self.x_hat_val = x_hat_val
+        x_hat_val = np.asarray(x_hat_val)
+        m = self.n - 1
+        rhs = np.empty(m * m + 2 * m)
+        rhs[:m * m] = x_hat_val[np.ix_(self.ks, self.ls)].ravel()
+        rhs[m * m:] = x_hat_val[self.i, self.j]
+        self.model.setAttr(GRB.Attr.RHS, self.constrs, rhs.tolist())
+
+    def optimize(self):
+        self.model.optimize()
+
+    def get_obj_val(self) -> float:
+        return self.model.ObjVal
+
+    def get_duals(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (lamb, theta, phi) the dual multipliers of constraints 1, 2, 3 respectively,\n
+        read with a single Pi query. lamb has shape (n, n), theta and phi have shape (n,),\n
+        entries belonging to k == i or l == j are zero."""
+        m = self.n - 1
+        pi = np.array(self.model.getAttr(GRB.Attr.Pi, self.constrs))
+        lamb = np.zeros((self.n, self.n))
+        lamb[np.ix_(self.ks, self.ls)] = pi[:m * m].reshape((m, m))
+        theta = np.zeros(self.n)
+        theta[self.ls] = pi[m * m:m * m + m]
+        phi = np.zeros(self.n)
+        phi[self.ks] = pi[m * m + m:]
+        return (lamb, theta, phi)
+
+
+class SubProblemPoolDP:
+    """Hands out the subproblem of pair (i, j) for a given x_hat_val,\n
+    solved by gurobi (SubProblemDP) or by network_flow (SubProblemFlowDP) depending on sp_solver.\n
+    When reuse is True every subproblem is build once per solve and afterwards only its right hand sides are updated,\n
+    so gurobi warm starts from the previous basis, at most max_size (-1 means no limit) are kept,\n
+    when more are build the least recently used one is freed. All gurobi subproblems share one environment.\n
+    Building, updating, solving and reading duals of the subproblems is traced as subproblem/* spans of tracer."""
+    def __init__(self, q, sp_solver: str, reuse: bool, gp_sp_output: bool, tracer: Tracer,  # noqa: PLR0913, PLR0917
+                 max_size: int = -1):
+        self.q = q
+        self.tracer = tracer
+        self.sp_solver = sp_solver
+        self.reuse = reuse
+        self.max_size = max_size
+        # ordered from least to most recently used
+        self.subproblems = {}
+
+        self.env = None
+        if self.sp_solver == DPS.GUROBI_SP:
+            self.env = gp.Env(empty=True)
+            if not gp_sp_output:
+                self.env.setParam('OutputFlag', 0)
+            # only right hand sides change between solves, the previous basis stays dual feasible
+            self.env.setParam('Method', 1)
+            self.env.start()
+        elif self.sp_solver != DPS.FLOW_SP:
+            raise ValueError('sp_solver setting is not DPS.GUROBI_SP or DPS.FLOW_SP')
+
+    def get(self, x_hat_val, i: int, j: int) -> SubProblemDP | SubProblemFlowDP:
+        spdp = self.subproblems.pop((i, j), None) if self.reuse else None
+        if spdp is None:
+            with self.tracer.span('subproblem/build'):
+                spdp = self.build(x_hat_val=x_hat_val, i=i, j=j)
+            if self.reuse:
+                if len(self.subproblems) == self.max_size:
+                    self.free(self.subproblems.pop(next(iter(self.subproblems))))
+                self.subproblems[i, j] = spdp
+        else:
+            self.subproblems[i, j] = spdp
+            with self.tracer.span('subproblem/update_x_hat'):
+                spdp.update_x_hat(x_hat_val)
+        return spdp
+
+    def build(self, x_hat_val, i: int, j: int) -> SubProblemDP | SubProblemFlowDP:
+        if self.sp_solver == DPS.FLOW_SP:
+            return SubProblemFlowDP(x_hat_val=x_hat_val, i=i, j=j, q=self.q)
+        return SubProblemDP(x_hat_val=x_hat_val, i=i, j=j, q=self.q, gp_sp_output=False, env=self.env)
+
+    def free(self, spdp: SubProblemDP | SubProblemFlowDP):
+        if self.env is not None:
+            spdp.model.dispose()
+
+    def dispose(self):
+        for spdp in self.subproblems.values():
+            self.free(spdp)
+        if self.env is not None:
+            self.env.dispose()
+        self.subproblems = {}
+
+
+def cut_coefficients(spdp: SubProblemDP | SubProblemFlowDP) -> np.ndarray:
+    """Returns the (n, n) coefficients of x in the benders cut of a solved subproblem,\n
+    entry [i, j] is sum theta + sum phi and entry [k, l] is lamb[k, l]."""
+    (lamb, theta, phi) = spdp.get_duals()
+    cut_coef = lamb.copy()
+    cut_coef[spdp.i, spdp.j] = theta.sum() + phi.sum()
+    return cut_coef
+
+
+class BendersCutPool:
+    """Remembers the benders cuts added so far, keyed by (i, j) and a hash of the cut coefficients,\n
+    the coefficients are divided by their largest absolute value and rounded to decimals first,\n
+    so near duplicates get the same key as well."""
+    def __init__(self, decimals: int):
+        self.decimals = decimals
+        self.keys = set()
+        self.hits = 0
+
+    def add(self, i: int, j: int, cut_coef: np.ndarray) -> bool:
+        """Returns True and stores the cut when it is not in the pool yet, otherwise counts a hit and returns False"""
+        scale = max(1., float(np.abs(cut_coef).max()))
+        # adding 0. turns -0. into 0. so both hash the same
+        rounded = np.round(cut_coef / scale, self.decimals) + 0.
+        key = (i, j, round(scale, self.decimals), hashlib.blake2b(rounded.tobytes(), digest_size=16).digest())
+        if key in self.keys:
+            self.hits += 1
+            return False
+        self.keys.add(key)
+        return True
+
+    def size(self) -> int:
+        return len(self.keys)
+
+
+def cut_scores(w_hat_val: float, w_bar_val: float, cut_coef: np.ndarray, num_w: int = 1) -> tuple[float, float]:
+    """Returns (rel_violation, efficacy) of the cut w[i,j] >= sum cut_coef * x at (x_hat, w_hat),\n
+    rel_violation = (w_bar - w_hat[i,j]) / max(1, |w_bar|),\n
+    efficacy = (w_bar - w_hat[i,j]) / ||(1, cut_coef)||, the euclidean distance of (x_hat, w_hat) to the cut.\n
+    For an aggregated cut over num_w variables w, w_hat and w_bar are sums and the norm is ||(1, ..., 1, cut_coef)||.\n
+    Note w_bar equals sum cut_coef * x_hat by strong duality of the subproblem."""
+    violation = w_bar_val - w_hat_val
+    rel_violation = violation / max(1., abs(w_bar_val))
+    efficacy = violation / np.sqrt(num_w + np.dot(cut_coef.ravel(), cut_coef.ravel()))
+    return (float(rel_violation), float(efficacy))
+
+
+def aggregation_key(cut_aggregation: DPS, i: int, j: int) -> tuple[int, int]:
+    """Returns the key of the aggregated cut that the cut of (i, j) is summed into, -1 for a summed index"""
+    if cut_aggregation == DPS.SINGLE_CUT:
+        return (-1, -1)
+    if cut_aggregation == DPS.ROW_CUT:
+        return (i, -1)
+    if cut_aggregation == DPS.COLUMN_CUT:
+        return (-1, j)
+    raise ValueError('cut_aggregation is not DPS.SINGLE_CUT, DPS.ROW_CUT or DPS.COLUMN_CUT')
+
+
+def pool_coefficients(cut_coef: np.ndarray, members: list[tuple[int, int]]) -> np.ndarray:
+    """Returns the coefficients that identify a cut in the BendersCutPool, cut_coef for a cut on a single w,\n
+    for an aggregated cut cut_coef followed by the 0/1 indicator of its members, since its key does not fix them."""
+    if len(members) == 1:
+        return cut_coef
+    n = cut_coef.shape[0]
+    indicator = np.zeros((n, n))
+    indicator[tuple(np.array(members).T)] = 1.
+    return np.concatenate([cut_coef.ravel(), indicator.ravel()])
+
+
+def permutation_w_bar(q, perm: np.ndarray) -> np.ndarray:
+    """Returns the (n, n) subproblem values for x_hat the permutation matrix of perm,\n
+    w_bar[i, perm[i]] = sum {k in [n] k not i} q[i][perm[i]][k][perm[k]] and all other entries are 0."""
+    n = perm.shape[0]
+    ks = np.arange(n)
+    # pair_costs[i, k] = q[i][perm[i]][k][perm[k]]
+    pair_costs = q[ks[:, None], perm[:, None], ks[None, :], perm[None, :]]
+    w_bar_val = np.zeros((n, n))
+    w_bar_val[ks, perm] = pair_costs.sum(axis=1) - pair_costs[ks, ks]
+    return w_bar_val
+
+
+def analytic_cut_coefficients(q, perm: np.ndarray, i: int, j: int) -> np.ndarray:
+    """Returns cut coefficients (see cut_coefficients) of the subproblem of (i, j) with perm[i] == j,\n
+    from an optimal dual that needs no solver.\n
+    With x_hat a permutation the only feasible x_1 is x_1[k, perm[k]] = 1,\n
+    so phi[k] = q[i][j][k][perm[k]], theta = 0 (or theta[perm[k]] = q[i][j][k][perm[k]], phi = 0)\n
+    and lamb[k,l] = min(0, q[i][j][k][l] - phi[k] - theta[l]) is optimal.\n
+    Of the two the one with the largest sum of lamb is used, as negative lamb weakens the cut elsewhere."""
+    n = perm.shape[0]
+    ks = np.array([k for k in range(n) if k != i])
+    ls = np.array([l for l in range(n) if l != j])
+    c = np.asarray(q[i][j], dtype=float)
+    c_assigned = c[ks, perm[ks]]
+    c_sub = c[np.ix_(ks, ls)]
+
+    lamb_row = np.minimum(0., c_sub - c_assigned[:, None])
+    c_assigned_to_col = np.zeros(n)
+    c_assigned_to_col[perm[ks]] = c_assigned
+    lamb_col = np.minimum(0., c_sub - c_assigned_to_col[ls][None, :])
+
+    cut_coef = np.zeros((n, n))
+    cut_coef[np.ix_(ks, ls)] = lamb_row if lamb_row.sum() >= lamb_col.sum() else lamb_col
+    cut_coef[i, j] = c_assigned.sum()
+    return cut_coef
+
+
+def separate_pairs(sp_pool: SubProblemPoolDP, x_hat_val: np.ndarray, w_hat_val: np.ndarray,  # noqa: PLR0913
+                   pairs: list[tuple[int, int]], settings: SettingsDP) -> list[tuple[int, int, float, np.ndarray]]:
+    """Solves the subproblems of the given pairs (i, j),\n
+    returns a list of (i, j, w_bar_val, cut_coef) where cut_coef is None when (x_hat, w_hat[i,j]) is in P_{i,j}."""
+    results = []
+    tracer = sp_pool.tracer
+    for (i, j) in pairs:
+        spdp = sp_pool.get(x_hat_val=x_hat_val, i=i, j=j)
+        with tracer.span('subproblem/optimize'):
+            spdp.optimize()
+        # if spdp.model.Status != 2: # todo add propper error handeling and writing to logfile when subproblem is not solved till optimality
+        #     raise Exception('subproblem was not solved till optimality')
+        w_bar_val = spdp.get_obj_val()
+
+        if settings.debug_print_cut_info and -w_hat_val[i, j] + w_bar_val > 0:
+            print(f'------debug_print_cut_info for (i,j): ({i},{j})------')
+            print(f'-w_hat_val[i, j] + w_bar_val[i, j] = {-w_hat_val[i, j] + w_bar_val}')
+            print(f'w_hat_val[i, j]: {w_hat_val[i, j]}')
+            print(f'w_bar_val[i, j]: {w_bar_val}')
+            print('spdp.x_1:\n', spdp.x_1)
+            print('spdp.x_hat_val:\n', spdp.x_hat_val)
+            print()
+
+        cut_coef = None
+        if w_hat_val[i, j] < w_bar_val - settings.minimum_w_difference:
+            with tracer.span('subproblem/duals'):
+                cut_coef = cut_coefficients(spdp)
+        results.append((i, j, w_bar_val, cut_coef))
+    return results
+
+
+# * worker processes
+# every worker holds q and a SubProblemPoolDP of its own, set once by _init_separation_worker,
+# workers do not trace, their time is part of the callback/separate span of the main process
+_worker_state = {}
+
+
+def _init_separation_worker(q, settings: SettingsDP):
+    _worker_state['settings'] = settings
+    _worker_state['sp_pool'] = SubProblemPoolDP(q=q, sp_solver=settings.sp_solver,
+                                                reuse=settings.reuse_subproblems, gp_sp_output=False,
+                                                tracer=Tracer(enabled=False), max_size=settings.max_reused_subproblems)
+
+
+def _separate_pairs_in_worker(x_hat_val, w_hat_val, pairs):
+    return separate_pairs(sp_pool=_worker_state['sp_pool'], x_hat_val=x_hat_val, w_hat_val=w_hat_val,
+                          pairs=pairs, settings=_worker_state['settings'])
+
+
+def add_xy_constrs(model: gp.Model, x_list: list, w_list: list, A: np.ndarray, B: np.ndarray,  # noqa: N803, PLR0913, PLR0914, PLR0917
+                   name: str) -> tuple[gp.MVar, gp.MVar]:
+    """Adds the xy cuts (see the top of this file) on the flat (row major) x_list and w_list to model in bulk,\n
+    returns z as (n, n) MVar and y as MVar with y[r * n + j] for the r-th nonzero off diagonal A[i][k] in row major order."""
+    n = round(np.sqrt(len(x_list)))
+    A = np.asarray(A, dtype=float)  # noqa: N806
+    B = np.asarray(B, dtype=float)  # noqa: N806
+    B_off = bd.off_diagonal_rows(B)  # noqa: N806
+    (lo, hi) = (B_off.min(axis=1), B_off.max(axis=1)) if n > 1 else (np.zeros(n), np.zeros(n))
+
+    z = model.addMVar((n, n), lb=-GRB.INFINITY, name='z')
+    (i, k) = np.nonzero(A * ~np.eye(n, dtype=bool))
+    num_pairs = i.shape[0]
+    y = model.addMVar(num_pairs * n, lb=-GRB.INFINITY)
+    model.update()
+    y_names = [f'y[{i_},{j_},{k_}]' for (i_, k_) in zip(i, k) for j_ in range(n)]
+    model.setAttr(GRB.Attr.VarName, y.tolist(), y_names)
+    all_vars = gp.MVar.fromlist(x_list + w_list + z.reshape(-1).tolist() + y.tolist())
+    (x_col, w_col, z_col, y_col) = (0, n * n, 2 * n * n, 3 * n * n)
+    num_cols = 3 * n * n + num_pairs * n
+
+    # z[j,k] - sum {l not j} B[j][l] * x[k,l] == 0
+    (j, k_, l) = np.nonzero(np.broadcast_to((B * ~np.eye(n, dtype=bool))[:, None, :] != 0, (n, n, n)))
+    rows = np.concatenate([np.arange(n * n), j * n + k_])
+    cols = np.concatenate([z_col + np.arange(n * n), x_col + k_ * n + l])
+    data = np.concatenate([np.ones(n * n), -B[j, l]])
+    coef = sp.csr_matrix((data, (rows, cols)), shape=(n * n, num_cols))
+    model.addMConstr(coef, all_vars, GRB.EQUAL, np.zeros(n * n), name=f'{name}_z')
+
+    # y[i,j,k] for every pair r and facility j, in the order of y
+    r = np.repeat(np.arange(num_pairs), n)
+    (i_r, k_r, j_r) = (i[r], k[r], np.tile(np.arange(n), num_pairs))
+    y_r = y_col + np.arange(num_pairs * n)
+    x_ij = x_col + i_r * n + j_r
+    z_jk = z_col + j_r * n + k_r
+    positive = A[i_r, k_r] > 0
+    for (sense, (bound_1, bound_2), keep) in [(GRB.GREATER_EQUAL, (hi, lo), positive),
+                                              (GRB.LESS_EQUAL, (lo, hi), ~positive)]:
+        num_rows = int(keep.sum())
+        rows = np.arange(num_rows)
+        # y[i,j,k] - z[j,k] - bound_1[j] * x[i,j] (>= or <=) -bound_1[j]
+        coef = sp.csr_matrix((np.concatenate([np.ones(num_rows), -np.ones(num_rows), -bound_1[j_r[keep]]]),
+                              (np.concatenate([rows, rows, rows]), np.concatenate([y_r[keep], z_jk[keep], x_ij[keep]]))),
+                             shape=(num_rows, num_cols))
+        model.addMConstr(coef, all_vars, sense, -bound_1[j_r[keep]])
+        # y[i,j,k] - bound_2[j] * x[i,j] (>= or <=) 0
+        coef = sp.csr_matrix((np.concatenate([np.ones(num_rows), -bound_2[j_r[keep]]]),
+                              (np.concatenate([rows, rows]), np.concatenate([y_r[keep], x_ij[keep]]))),
+                             shape=(num_rows, num_cols))
+        model.addMConstr(coef, all_vars, sense, np.zeros(num_rows))
+
+    # w[i,j] - sum {k not i} A[i][k] * y[i,j,k] >= 0
+    rows = np.concatenate([np.arange(n * n), i_r * n + j_r])
+    cols = np.concatenate([w_col + np.arange(n * n), y_r])
+    data = np.concatenate([np.ones(n * n), -A[i_r, k_r]])
+    coef = sp.csr_matrix((data, (rows, cols)), shape=(n * n, num_cols))
+    model.addMConstr(coef, all_vars, GRB.GREATER_EQUAL, np.zeros(n * n), name=f'{name}_w')
+    return (z, y)
 
 
 def solve_with_dp(q: np.ndarray, settings: SettingsDP) -> gp.Model:
@@ -401,13 +934,16 @@ def solve_with_dp(q: np.ndarray, settings: SettingsDP) -> gp.Model:
     if settings.debug_benders_cuts:
         dpm.init_constraint_storage()
 
-    dpm.model.optimize(lambda model, where:
-                       dpm.benders_callback(
-                           do_not_use_model=model, where=where))
-    # note model is passed as do_not_used_model but is not used in the function body
-
-    if settings.debug_benders_cuts:
-        dpm.write_constraint_storage_to_file(
-            debug_lp_path='results/test_out/temp_debug_file_1.lp')
-    
+    # dispose also when optimize raises, so no worker processes or subproblems are left behind
+    try:
+        dpm.model.optimize(lambda model, where:
+                           dpm.benders_callback(
+                               do_not_use_model=model, where=where))
+        # note model is passed as do_not_used_model but is not used in the function body
+
+        if settings.debug_benders_cuts:
+            dpm.write_constraint_storage_to_file(
+                debug_lp_path='results/test_out/temp_debug_file_1.lp')
+    finally:
+        dpm.dispose()
     return dpm.model
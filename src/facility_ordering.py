@@ -0,0 +1,99 @@
+# * interchangeable facilities
+# facilities g and h are interchangeable when swapping them is an automorphism of B,
+# B[g][l] == B[h][l] and B[l][g] == B[l][h] for all l not g, h, B[g][g] == B[h][h] and B[g][h] == B[h][g],
+# e.g. all facilities with zero flow (all zero rows and columns of B), as in the esc instances.
+# Interchangeable facilities form groups, within a group every permutation of the facilities keeps the cost.
+# * ordering
+# A group of t facilities multiplies every solution t! times. With the facilities g_1 < ... < g_t of a group
+# the solutions are restricted to those where the locations of g_1, ..., g_t are increasing, by
+# x[i,g_{s+1}] <= sum {i' < i} x[i',g_s]      for all i and s < t,
+# so g_{s+1} can only be at i when g_s is at a location before i.
+# Note this does not shrink the instance, the zero flow facilities can not be removed, each still takes a location,
+# so without them the qap is rectangular (n locations, fewer facilities) which the square models do not express,
+# their w rows and subproblems are already left out as their pairs have no cost (see data_handler.active_pairs).
+# The model keeps the original labelling, so solutions are checked by the checker as before.
+# * settings
+# order_interchangeable adds these constraints (see symmetry.add_symmetry_breaking_constrs), it needs q as FactoredQ
+# and can not be combined with symmetry_breaking.
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gp
+from gurobipy import GRB
+import checker as ch
+import data_handler as dh
+from time import time
+
+
+class InterchangeableFacilities:
+    def __init__(self, B: np.ndarray):  # noqa: N803
+        self.groups = interchangeable_groups(C=np.asarray(B))
+
+    def canonical_permutation(self, perm: np.ndarray) -> np.ndarray:
+        """Returns the permutation with the same cost as perm where every group has increasing locations"""
+        canonical = np.asarray(perm).copy()
+        inverse = np.argsort(canonical)
+        for group in self.groups:
+            # the locations of the group, sorted, get the facilities of the group in increasing order
+            canonical[np.sort(inverse[group])] = group
+        return canonical
+
+
+def add_ordering_constrs(model: gp.Model, x_list: list, q) -> InterchangeableFacilities | None:
+    """Finds the groups of interchangeable facilities and adds x[i,g_{s+1}] <= sum {i' < i} x[i',g_s] for all groups,\n
+    x_list is row major. Stores the number of facilities in a group of more than one, the number of rows and the time in\n
+    model._ordering_num_facilities, model._ordering_num_constrs and model._ordering_time.\n
+    Returns the InterchangeableFacilities, or None when q is not a FactoredQ since the detection needs B."""
+    model._ordering_num_facilities = 0
+    model._ordering_num_constrs = 0
+    model._ordering_time = 0.
+    if not isinstance(q, dh.FactoredQ):
+        print('ordering skipped, it needs q as FactoredQ (A and B)')
+        return None
+    start = time()
+    interchangeable = InterchangeableFacilities(B=q.B)
+    n = q.shape[0]
+    # x[i,h] - sum {i' < i} x[i',g] <= 0 for consecutive facilities (g, h) of the groups,
+    # over the row major x the rows of a pair are kron(I, e_h) - kron(L, e_g) with L the strict lower triangle
+    lower = sp.tril(np.ones((n, n)), k=-1, format='csr')
+    blocks = [sp.kron(sp.identity(n), unit(n=n, j=h)) - sp.kron(lower, unit(n=n, j=g))
+              for group in interchangeable.groups for (g, h) in zip(group[:-1], group[1:])]
+    num_rows = len(blocks) * n
+    if blocks:
+        coef = sp.vstack(blocks, format='csr')
+        model.addMConstr(coef, gp.MVar.fromlist(x_list), GRB.LESS_EQUAL, np.zeros(num_rows), name='constr_ordering')
+    model._ordering_num_facilities = sum(len(group) for group in interchangeable.groups)
+    model._ordering_num_constrs = num_rows
+    model._ordering_time = time() - start
+    return interchangeable
+
+
+def interchangeable_groups(C: np.ndarray) -> list[np.ndarray]:  # noqa: N803
+    """Returns the groups (increasing arrays) of more than one interchangeable vertex of C,\n
+    a vertex joins the group of the first earlier vertex that it can be swapped with."""
+    n = C.shape[0]
+    # swapping keeps the diagonal and the sorted rows and columns, only those candidates are checked
+    keys = np.concatenate([np.diag(C)[:, None], np.sort(C, axis=1), np.sort(C, axis=0).T], axis=1)
+    group_of = np.full(n, -1)
+    firsts = []
+    for v in range(n):
+        for (index, first) in enumerate(firsts):
+            if np.array_equal(keys[v], keys[first]) and ch.is_automorphism(perm=swap(n=n, a=first, b=v), C=C):
+                group_of[v] = index
+                break
+        else:
+            group_of[v] = len(firsts)
+            firsts.append(v)
+    groups = [np.flatnonzero(group_of == index) for index in range(len(firsts))]
+    return [group for group in groups if group.shape[0] > 1]
+
+
+def unit(n: int, j: int) -> sp.csr_matrix:
+    """Returns the (1, n) sparse row with a 1 at j"""
+    return sp.csr_matrix(([1.], ([0], [j])), shape=(1, n))
+
+
+def swap(n: int, a: int, b: int) -> np.ndarray:
+    """Returns the permutation of range(n) that swaps a and b"""
+    perm = np.arange(n)
+    perm[[a, b]] = perm[[b, a]]
+    return perm
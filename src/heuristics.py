@@ -0,0 +1,196 @@
+# this document contains primal heuristics for the Koopmans-Beckmann qap
+# the cost of a permutation perm (location i gets facility perm[i]) is
+#   cost(perm) = sum_{i,k} A[i][k] * B[perm[i]][perm[k]],
+# which equals the objective of the kbl, dp and rlt models for x[i, perm[i]] = 1.
+# * swap deltas
+# swapping the facilities of locations r and s changes the cost by delta[r, s] (Taillard 1991),
+# with Bp = B[perm][:, perm], a = diag(A) and b = diag(Bp)
+#   delta[r, s] = (a[r] - a[s]) * (b[s] - b[r]) + (A[r,s] - A[s,r]) * (Bp[s,r] - Bp[r,s])
+#               + sum_{k not r,s} (A[k,r] - A[k,s]) * (Bp[k,s] - Bp[k,r]) + (A[r,k] - A[s,k]) * (Bp[s,k] - Bp[r,k]),
+# swap_deltas evaluates it for all (r, s) at once with two matrix products, the sums over all k
+# are A^T Bp and A Bp^T from which the terms of k == r and k == s are subtracted, this is O(n^3).
+# After a swap of (r, s) the searches update delta in O(n^2) instead (update_swap_deltas), for u, v not in {r, s}
+# with Bp of the new perm (Taillard 1991)
+#   delta'[u, v] = delta[u, v] + (A[r,u] - A[r,v] + A[s,v] - A[s,u]) * (Bp[s,u] - Bp[s,v] + Bp[r,v] - Bp[r,u])
+#                              + (A[u,r] - A[v,r] + A[v,s] - A[u,s]) * (Bp[u,s] - Bp[v,s] + Bp[v,r] - Bp[u,r]),
+# and the rows and columns of r and s are evaluated again by the formula above in O(n^2) (row_swap_deltas).
+# * search
+# local_search is a steepest descent over swaps (2-opt), robust_tabu_search is the robust tabu search of Taillard,
+# a swap is tabu when both facilities would return to a location they left less than tenure iterations ago,
+# the tenure is redrawn from [0.9 n, 1.1 n] every 2 n iterations, a tabu swap is allowed when it improves the best cost
+# and a swap that places both facilities at locations they did not visit for aspiration iterations is forced.
+# * settings
+# With heuristic_time_limit > 0 the robust tabu search runs for that many seconds before the solve and its permutation
+# is set as mip start (set_heuristic_start), 0 disables it. It needs q as FactoredQ.
+# heuristic_cutoff also sets model.Params.Cutoff to the cost of that permutation,
+# heuristic_seed seeds the random start and the tenures, so runs are reproducible.
+# The heuristic runs before gurobi starts, so its time comes on top of time_limit.
+import numpy as np
+from time import time
+import checker as ch
+import data_handler as dh
+
+
+def swap_deltas(A: np.ndarray, B: np.ndarray, perm: np.ndarray) -> np.ndarray:  # noqa: N803
+    """Returns the (n, n) matrix of cost changes of swapping the facilities of locations r and s, 0 on the diagonal"""
+    Bp = B[perm][:, perm]  # noqa: N806
+    a = np.diag(A)
+    b = np.diag(Bp)
+    M = A.T @ Bp  # noqa: N806
+    N = A @ Bp.T  # noqa: N806
+    d_M = np.diag(M)
+    d_N = np.diag(N)
+    a_r = a[:, None]
+    a_s = a[None, :]
+    b_r = b[:, None]
+    b_s = b[None, :]
+
+    delta = (a_r - a_s) * (b_s - b_r) + (A - A.T) * (Bp.T - Bp)
+    # sums over all k
+    delta += M + M.T - d_M[:, None] - d_M[None, :]
+    delta += N + N.T - d_N[:, None] - d_N[None, :]
+    # minus the terms of k == r and k == s
+    delta -= (a_r - A) * (Bp - b_r) + (a_r - A.T) * (Bp.T - b_r)
+    delta -= (A.T - a_s) * (b_s - Bp.T) + (A - a_s) * (b_s - Bp)
+    np.fill_diagonal(delta, 0)
+    return delta
+
+
+def row_swap_deltas(A: np.ndarray, Bp: np.ndarray, r: int) -> np.ndarray:  # noqa: N803
+    """Returns row r of swap_deltas, the cost changes of swapping the facilities of locations r and s for all s,\n
+    in O(n^2) given Bp = B[perm][:, perm]."""
+    a = np.diag(A)
+    b = np.diag(Bp)
+    # sums over all k
+    row = ((A[:, r][:, None] - A) * (Bp - Bp[:, r][:, None])).sum(axis=0)
+    row += ((A[r, :][None, :] - A) * (Bp - Bp[r, :][None, :])).sum(axis=1)
+    # minus the terms of k == r and k == s
+    row -= (A[r, r] - A[r, :]) * (Bp[r, :] - Bp[r, r]) + (A[r, r] - A[:, r]) * (Bp[:, r] - Bp[r, r])
+    row -= (A[:, r] - a) * (b - Bp[:, r]) + (A[r, :] - a) * (b - Bp[r, :])
+    row += (A[r, r] - a) * (b - Bp[r, r]) + (A[r, :] - A[:, r]) * (Bp[:, r] - Bp[r, :])
+    row[r] = 0
+    return row
+
+
+def update_swap_deltas(A: np.ndarray, B: np.ndarray, perm: np.ndarray, delta: np.ndarray, r: int, s: int):  # noqa: N803, PLR0913, PLR0917
+    """Updates delta, the swap_deltas before the swap of (r, s), in place to the swap_deltas of perm,\n
+    the permutation after the swap, in O(n^2), see the top of this file."""
+    Bp = B[perm][:, perm]  # noqa: N806
+    x = A[r, :] - A[s, :]
+    y = Bp[s, :] - Bp[r, :]
+    x_t = A[:, r] - A[:, s]
+    y_t = Bp[:, s] - Bp[:, r]
+    delta += (x[:, None] - x[None, :]) * (y[:, None] - y[None, :])
+    delta += (x_t[:, None] - x_t[None, :]) * (y_t[:, None] - y_t[None, :])
+    for t in (r, s):
+        delta[t, :] = row_swap_deltas(A=A, Bp=Bp, r=t)
+        delta[:, t] = delta[t, :]
+
+
+def local_search(A: np.ndarray, B: np.ndarray, perm: np.ndarray) -> tuple[np.ndarray, float]:  # noqa: N803
+    """Applies the best improving swap until none is left, returns (perm, cost) of the resulting 2-opt local optimum"""
+    perm = perm.copy()
+    cost = ch.comp_obj_val_perm(perm=perm, A=A, B=B)
+    delta = swap_deltas(A=A, B=B, perm=perm)
+    while True:
+        (r, s) = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[r, s] >= 0:
+            return (perm, cost)
+        perm[[r, s]] = perm[[s, r]]
+        cost += delta[r, s].item()
+        update_swap_deltas(A=A, B=B, perm=perm, delta=delta, r=r, s=s)
+
+
+def robust_tabu_search(A: np.ndarray, B: np.ndarray, perm: np.ndarray, time_limit: float,  # noqa: N803, PLR0913, PLR0914
+                       max_iter: int = -1, seed: int | None = None) -> tuple[np.ndarray, float]:
+    """Robust tabu search starting from perm, stops after time_limit seconds or max_iter iterations (-1 means no limit),\n
+    returns (perm, cost) of the best permutation found."""
+    start = time()
+    rng = np.random.default_rng(seed)
+    n = perm.shape[0]
+    perm = perm.copy()
+    cost = ch.comp_obj_val_perm(perm=perm, A=A, B=B)
+    (best_perm, best_cost) = (perm.copy(), cost)
+    if n < 2:  # noqa: PLR2004
+        return (best_perm, best_cost)
+
+    upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+    aspiration = 5 * n * n
+    # left_at[loc, fac] is the iteration facility fac last left location loc
+    left_at = -np.arange(n * n).reshape(n, n) - 1
+    tenure = n
+    it = 0
+    delta = swap_deltas(A=A, B=B, perm=perm)
+    while (max_iter == -1 or it < max_iter) and time() - start < time_limit:
+        if it % (2 * n) == 0:
+            tenure = max(2, int(rng.integers(int(0.9 * n), int(1.1 * n) + 1)))
+
+        # swap (r, s) places facility perm[s] at location r and facility perm[r] at location s
+        since_r = it - left_at[:, perm]  # since_r[r, s] = it - left_at[r, perm[s]]
+        since_s = since_r.T
+        tabu = (since_r < tenure) & (since_s < tenure)
+        forced = (since_r > aspiration) & (since_s > aspiration) & upper
+        if forced.any():
+            allowed = forced
+        else:
+            allowed = upper & (~tabu | (cost + delta < best_cost))
+            if not allowed.any():
+                allowed = upper
+        (r, s) = np.unravel_index(np.argmin(np.where(allowed, delta, np.inf)), delta.shape)
+
+        left_at[r, perm[r]] = it
+        left_at[s, perm[s]] = it
+        perm[[r, s]] = perm[[s, r]]
+        cost += delta[r, s].item()
+        update_swap_deltas(A=A, B=B, perm=perm, delta=delta, r=r, s=s)
+        if cost < best_cost:
+            (best_perm, best_cost) = (perm.copy(), cost)
+        it += 1
+    return (best_perm, best_cost)
+
+
+def heuristic_permutation(q, time_limit: float, seed: int | None = None) -> tuple[np.ndarray, float] | None:
+    """Returns (perm, cost) found by local_search from a random permutation followed by robust_tabu_search\n
+    within time_limit seconds, or None when q is not a FactoredQ since the swap deltas need A and B."""
+    if not isinstance(q, dh.FactoredQ):
+        print('heuristic skipped, it needs q as FactoredQ (A and B)')
+        return None
+    start = time()
+    A = np.asarray(q.A)  # noqa: N806
+    B = np.asarray(q.B)  # noqa: N806
+    rng = np.random.default_rng(seed)
+    (perm, _) = local_search(A=A, B=B, perm=rng.permutation(q.n))
+    return robust_tabu_search(A=A, B=B, perm=perm, time_limit=max(0., time_limit - (time() - start)), seed=seed)
+
+
+def set_heuristic_start(model, x, q, time_limit: float, cutoff: bool, seed: int | None = None,  # noqa: PLR0913, PLR0917
+                        symmetry=None) -> np.ndarray | None:
+    """Runs heuristic_permutation with seed for time_limit seconds (0 disables it) and sets its permutation as mip start of x,\n
+    with cutoff set to True model.Params.Cutoff is set to its cost. Stores the cost and time of the heuristic\n
+    in model._heuristic_obj_val and model._heuristic_time, returns the permutation or None.\n
+    When symmetry (a symmetry.SymmetryBreaking or facility_ordering.InterchangeableFacilities) is given\n
+    the permutation is first mapped to its canonical permutation,\n
+    so the start satisfies the symmetry breaking constraints."""
+    model._heuristic_obj_val = None
+    model._heuristic_time = 0.
+    if time_limit < 0:
+        raise ValueError('heuristic_time_limit setting is < 0')
+    if time_limit == 0:
+        return None
+    start = time()
+    result = heuristic_permutation(q=q, time_limit=time_limit, seed=seed)
+    model._heuristic_time = time() - start
+    if result is None:
+        return None
+    (perm, cost) = result
+    if symmetry is not None:
+        perm = symmetry.canonical_permutation(perm)
+    model._heuristic_obj_val = cost
+    n = perm.shape[0]
+    for i in range(n):
+        for j in range(n):
+            x[i, j].Start = 1 if perm[i] == j else 0
+    if cutoff:
+        # a little above cost, so the start itself is not cut off
+        model.Params.Cutoff = cost + 1e-6 * max(1., abs(cost))
+    return perm
@@ -0,0 +1,122 @@
+# this document contains a binary cache of instance (.dat) and solution (.sln) files
+# * layout of cache_dir
+# instances.bin     raw int64 values, per instance A then B (row major), per solution the permutation
+# index.json        per file name the offsets (in values) into instances.bin and the size and mtime of the source file
+# loading maps instances.bin once with np.memmap, so A, B and permutations are read only views without copies.
+# A file is (re)converted when it is missing from the index or its source file changed.
+# Note appending is not safe with concurrent writers, convert all files with build before running in parallel
+# and open the cache with read_only=True there, files missing from a read only cache are parsed instead.
+import os
+import re
+import json
+import numpy as np
+import data_handler as dh
+
+DTYPE = np.int64
+
+
+class InstanceCache:
+    def __init__(self, cache_dir: str, read_only: bool = False):
+        self.cache_dir = cache_dir
+        self.read_only = read_only
+        self.bin_path = os.path.join(cache_dir, 'instances.bin')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.index = self.read_index()
+        self.memmap = None
+
+    def read_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {'dtype': np.dtype(DTYPE).name, 'instances': {}, 'solutions': {}}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def write_index(self):
+        # write to a temporary file and rename, so the index is never half written
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def values(self, offset: int, size: int) -> np.ndarray:
+        """Returns a read only view of size values at offset of instances.bin"""
+        if self.memmap is None or self.memmap.shape[0] < offset + size:
+            self.memmap = np.memmap(self.bin_path, dtype=DTYPE, mode='r')
+        return self.memmap[offset:offset + size]
+
+    def append(self, arrays: list[np.ndarray]) -> int:
+        """Appends arrays to instances.bin, returns the offset of the first array"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.bin_path, 'ab') as f:
+            offset = f.tell() // np.dtype(DTYPE).itemsize
+            for array in arrays:
+                f.write(np.ascontiguousarray(array, dtype=DTYPE).tobytes())
+        return offset
+
+    def get_AB(self, file_path: str) -> tuple[np.ndarray, np.ndarray]:  # noqa: N802
+        """Returns (A, B) of the instance file, converting it first when it is not cached"""
+        key = os.path.basename(file_path)
+        entry = self.index['instances'].get(key)
+        if entry is None or not is_current(entry, file_path):
+            (A, B) = dh.parse_AB(file_path)  # noqa: N806
+            if self.read_only:
+                return (A, B)
+            entry = {**source_info(file_path), 'n': A.shape[0], 'offset': self.append([A, B])}
+            self.index['instances'][key] = entry
+            self.write_index()
+        n = entry['n']
+        values = self.values(entry['offset'], 2 * n * n)
+        return (values[:n * n].reshape(n, n), values[n * n:].reshape(n, n))
+
+    def get_sol(self, sol_file: str) -> tuple[int, int, np.ndarray]:
+        """Returns (n, obj_val, permutation) of the solution file, converting it first when it is not cached"""
+        key = os.path.basename(sol_file)
+        entry = self.index['solutions'].get(key)
+        if entry is None or not is_current(entry, sol_file):
+            (n, obj_val, permutation) = parse_sol(sol_file)
+            if self.read_only:
+                return (n, obj_val, permutation)
+            entry = {**source_info(sol_file), 'n': n, 'obj_val': obj_val, 'offset': self.append([permutation])}
+            self.index['solutions'][key] = entry
+            self.write_index()
+        return (entry['n'], entry['obj_val'], self.values(entry['offset'], entry['n']))
+
+    def build(self, data_dir: str, sol_dir: str | None = None) -> list[tuple[str, str]]:
+        """One time conversion of all .dat files in data_dir and all .sln files in sol_dir,\n
+        returns a list of (file_name, error) of the files that could not be parsed, these are skipped."""
+        if self.read_only:
+            raise ValueError('cannot build a read only InstanceCache')
+        files = [(data_dir, file_name, self.get_AB) for file_name in sorted(os.listdir(data_dir))
+                 if file_name.endswith('.dat')]
+        if sol_dir is not None:
+            files += [(sol_dir, file_name, self.get_sol) for file_name in sorted(os.listdir(sol_dir))
+                      if file_name.endswith('.sln')]
+        failed = []
+        for (directory, file_name, get) in files:
+            try:
+                get(os.path.join(directory, file_name))
+            except Exception as e:  # noqa: BLE001
+                failed.append((file_name, str(e)))
+        return failed
+
+
+def source_info(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def is_current(entry: dict, file_path: str) -> bool:
+    """Returns True when the source file did not change since entry was cached"""
+    info = source_info(file_path)
+    return entry['source_size'] == info['source_size'] and entry['source_mtime_ns'] == info['source_mtime_ns']
+
+
+def parse_sol(sol_file: str) -> tuple[int, int, np.ndarray]:
+    """Returns (n, obj_val, permutation) parsed from the solution file"""
+    with open(sol_file) as file:
+        all_ints = np.array(re.findall('[0-9]+', file.read()), dtype=DTYPE)
+    n = int(all_ints[0])
+    obj_val = int(all_ints[1])
+    permutation = all_ints[2:]
+    if len(permutation) != n:
+        raise Exception('len(permutation) != n')
+    return (n, obj_val, permutation)
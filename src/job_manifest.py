@@ -0,0 +1,77 @@
+# this document contains an append only manifest of experiment jobs
+# every line of the manifest file is one json record
+#   {"instance": ..., "method": ..., "settings_hash": ..., "state": ..., "day_time": ..., ...}
+# the latest record of a job (instance, method, settings_hash) holds its state.
+# Each record is written with a single os.write on a file opened with O_APPEND,
+# so records of concurrent writers do not interleave and a crash leaves at most one partial last line,
+# which load skips.
+from enum import Enum
+import datetime
+import hashlib
+import json
+import os
+
+
+# settings that only say where output goes, they depend on the machine and are left out of settings_hash
+OUTPUT_SETTINGS = ('telemetry_dir',)
+
+
+class JobState(Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+def settings_hash(settings) -> str:
+    """Returns a short hash of the settings dataclass without its OUTPUT_SETTINGS,\n
+    equal settings give equal hashes across runs and machines"""
+    solve_settings = {key: value for (key, value) in settings.__dict__.items() if key not in OUTPUT_SETTINGS}
+    settings_json = json.dumps(solve_settings, sort_keys=True, default=str)
+    return hashlib.sha1(settings_json.encode()).hexdigest()[:12]
+
+
+class JobManifest:
+    """Append only record of the state of (instance, method, settings_hash) jobs in the jsonl file file_path"""
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def append(self, instance: str, method: str, settings_hash: str, state: JobState, **info):
+        """Appends one record, info holds extra json serializable fields e.g. error or pid"""
+        record = {'instance': instance,
+                  'method': method,
+                  'settings_hash': settings_hash,
+                  'state': state.value,
+                  'day_time': datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S'),
+                  **info}
+        line = (json.dumps(record) + '\n').encode()
+        fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def load(self) -> dict[tuple[str, str, str], dict]:
+        """Returns the latest record per (instance, method, settings_hash)"""
+        latest = {}
+        if not os.path.exists(self.file_path):
+            return latest
+        with open(self.file_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # partial line of an interrupted write
+                    continue
+                latest[record['instance'], record['method'], record['settings_hash']] = record
+        return latest
+
+    def states(self) -> dict[tuple[str, str, str], JobState]:
+        """Returns the latest state per (instance, method, settings_hash)"""
+        return {job: JobState(record['state']) for (job, record) in self.load().items()}
+
+    def missing(self, jobs: list[tuple[str, str, str]]) -> list[tuple[str, str, str]]:
+        """Returns the jobs (instance, method, settings_hash) that are not done"""
+        states = self.states()
+        return [job for job in jobs if states.get(job) != JobState.DONE]
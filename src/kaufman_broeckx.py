@@ -10,7 +10,8 @@
 #       sum_{j} x_{i,j} == 1    for all i
 #       x_{i,j} is binary       for all i,j
 #
-#       where, M_{i,j} = sum_k sum_l q_{i,j,k,l}.
+#       where, M_{i,j} = sum_k sum_l q_{i,j,k,l},
+#       or a tighter bound on the sum for x_{i,j} == 0 depending on settings.big_m (see bounds.py).
 
 # * pseudo code for gurobi
 # ensure you have q in numpy array format
@@ -35,23 +36,35 @@ from settings import SettingsKBL
 import gurobipy as gp
 from gurobipy import GRB
 import numpy as np
+import scipy.sparse as sp
 import checker as ch
+import data_handler as dh
+import heuristics as hr
+import bounds as bd
+import symmetry as sy
+from time import time
 
 
 class KaufmanBroeckxLinearization:
     def __init__(self, q, settings: SettingsKBL):
+        build_start = time()
         self.q = q
         self.settings = settings
         self.n = ch.check_q(q=q)
-        self.M = compute_M(q=q)
+        self.M = bd.big_m(q=q, method=self.settings.big_m, exclude_diagonal=False)
         
         self.model = gp.Model('Kaufman-Broeckx')
 
         self.x = self.model.addVars(self.n, self.n, vtype=GRB.BINARY, name='x')
         self.w = self.model.addVars(self.n, self.n, vtype=GRB.CONTINUOUS, name='w', lb=0)
+        # flat (row major) lists of x and w, matching the rows and columns of q_to_sparse_matrix
+        self.x_list = [self.x[i, j] for i in range(self.n) for j in range(self.n)]
+        self.w_list = [self.w[i, j] for i in range(self.n) for j in range(self.n)]
 
         self.add_constraints()
         self.set_objective()
+        self.model.update()
+        self.model._build_time = time() - build_start
 
         if self.settings.pre_crush:
             self.model.Params.PreCrush = 1
@@ -59,6 +72,9 @@ class KaufmanBroeckxLinearization:
         self.set_time_limit()
         self.set_threads()
         self.set_soft_mem_limit()
+        hr.set_heuristic_start(model=self.model, x=self.x, q=self.q, time_limit=self.settings.heuristic_time_limit,
+                               cutoff=self.settings.heuristic_cutoff, seed=self.settings.heuristic_seed,
+                               symmetry=self.symmetry)
 
     def add_constraints(self):
         self.model.addConstrs((gp.quicksum(
@@ -69,11 +85,9 @@ class KaufmanBroeckxLinearization:
             self.x[i, j] for j in range(self.n)) == 1 for i in range(self.n)),
             name='constr_sum_1_for_all_i')
         
-        self.model.addConstrs((self.w[i, j] >= gp.quicksum(
-            self.q[i][j][k][l] * self.x[k, l] - self.M[i][j] * (1 - self.x[i, j])
-            for k in range(self.n) for l in range(self.n))
-            for i in range(self.n) for j in range(self.n)),
-            name='constr_on_w_for_all_ij')
+        add_w_constrs(model=self.model, x_list=self.x_list, w_list=self.w_list,
+                      Q=dh.q_to_sparse_matrix(self.q), M=self.M, name='constr_on_w_for_all_ij')
+        self.symmetry = sy.add_symmetry_breaking_constrs(model=self.model, x=self.x, q=self.q, settings=self.settings)
     
     def set_objective(self):
         self.model.ModelSense = GRB.MINIMIZE
@@ -111,8 +125,25 @@ def solve_with_kbl(q: np.ndarray, settings: SettingsKBL) -> gp.Model:
     return kbl.model
 
 
+def add_w_constrs(model: gp.Model, x_list: list, w_list: list,  # noqa: PLR0913
+                  Q: sp.csr_matrix, M: np.ndarray, name: str) -> list[gp.Constr]:  # noqa: N803
+    """Adds w[i,j] >= sum_{k,l} Q[i*n + j, k*n + l] * x[k,l] - M[i][j] * (1 - x[i,j]) for all i,j with one addMConstr,\n
+    as w[i,j] - sum_{k,l} Q[i*n + j, k*n + l] * x[k,l] - M[i][j] * x[i,j] >= -M[i][j].\n
+    Rows with an empty row of Q are left out, they read w[i,j] >= -M[i][j] * (1 - x[i,j]) which w >= 0 implies.\n
+    x_list and w_list are row major, the constraints are named name[i,j] like addConstrs would."""
+    n = round(np.sqrt(len(x_list)))
+    Q = sp.csr_matrix(Q)  # noqa: N806
+    Q.eliminate_zeros()
+    rows = np.flatnonzero(np.diff(Q.indptr))
+    M_flat = np.asarray(M, dtype=float).ravel()  # noqa: N806
+    coef = sp.hstack([-Q - sp.diags(M_flat), sp.identity(n * n)], format='csr')[rows]
+    constrs = model.addMConstr(coef, gp.MVar.fromlist(x_list + w_list), GRB.GREATER_EQUAL, -M_flat[rows]).tolist()
+    model.setAttr(GRB.Attr.ConstrName, constrs, [f'{name}[{i},{j}]' for (i, j) in zip(*np.divmod(rows, n))])
+    return constrs
+
+
 def compute_M(q) -> np.ndarray:  # noqa: N802
-    M = np.sum(q, axis=(2, 3))  # noqa: N806
+    M = q.sum(axis=(2, 3))  # noqa: N806
     if not isinstance(M, np.ndarray):
         raise Exception('M type is not np.ndarray')
     return M
@@ -21,7 +21,9 @@ if __name__ == "__main__":
     data_path = my_path + 'data/test_inputs/3x3_test.dat'
 
     # * get instance
-    # (q, instance_name) = dh.generate_random_q()
+    # the checker needs A and B, so a random instance is generated as (A, B) and not as dense q
+    # (A, B) = dh.generate_random_AB()
+    # (q, instance_name) = (dh.FactoredQ(A=A, B=B), 'random_AB_with_n=8_seed=1')
     (q, instance_name) = dh.file_to_q(data_path)
 
     # * specify solving methods
@@ -55,9 +57,12 @@ if __name__ == "__main__":
         
         all_checks = ch.check_all(model=model,
                                 data_file=data_path,
-                                sol_file=sol_path)
+                                sol_file=sol_path,
+                                A=q.A,
+                                B=q.B,
+                                obj_val_tol=ch.model_obj_val_tol(solving_technique=method_name, settings=settings))
         
-        extra_info = {'raw_time': raw_time}
+        extra_info = {'raw_time': raw_time, 'build_time': model._build_time}
         
         wt.create_txt(model=model,
                     output_folder_path=output_folder_path,
@@ -0,0 +1,143 @@
+# this document contains a combinatorial solver for the subproblem of disjunctive_programming.py
+
+# * subproblem as a network
+# the subproblem of pair (i,j) (see SubProblemDP) is a capacitated transportation problem
+# source -> row k          capacity x_hat[i,j],    cost 0,              for all k \in [n] k not i
+# row k  -> col l          capacity x_hat[k,l],    cost q[i][j][k][l],  for all k \in [n] k not i, l \in [n] l not j
+# col l  -> sink           capacity x_hat[i,j],    cost 0,              for all l \in [n] l not j
+# a min cost flow of value (n-1) * x_hat[i,j] saturates all source and sink arcs,
+# so it satisfies constraints 2 and 3 and is an optimal x_1.
+
+# * duals
+# let D be node potentials of the final residual graph, meaning
+# reduced cost c[u,v] + D[u] - D[v] >= 0 for every residual arc (u,v),
+# then
+# phi[k]    = -D[row k]                                         (constr 3)
+# theta[l]  =  D[col l]                                         (constr 2)
+# lamb[k,l] =  min(0, q[i][j][k][l] - phi[k] - theta[l])        (constr 1)
+# is dual feasible and satisfies complementary slackness with the flow, hence the duals are optimal.
+
+# * algorithm
+# successive shortest paths, where shortest paths are computed with Dijkstra (scipy.sparse.csgraph) on the
+# reduced costs c[u,v] + D[u] - D[v] of dense (2n x 2n) residual and cost matrices (Edmonds-Karp, Tomizawa).
+# D starts at 0, which is valid since c >= 0 and there are no reverse arcs yet, after every search
+# D[v] += min(dist[v], dist[sink]), which keeps all reduced costs of the residual graph nonnegative
+# and makes them zero on the shortest paths of the search tree, so also on their reverse arcs after augmenting.
+# Every search augments along the tree paths of all cols that reach the sink on a shortest path,
+# which keeps the reduced costs nonnegative and cuts the number of searches.
+# A search is O(n^2 log n) in compiled code, where Bellman-Ford needs up to 2n passes of O(n^2),
+# and the final D are the potentials of the duals.
+# ruff: noqa: E741
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+
+def solve_transportation(c: np.ndarray, cap: np.ndarray, t: float,
+                         eps: float = 1e-9) -> tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+    """Solves min sum c * f s.t. 0 <= f <= cap, all row sums and column sums of f equal t.\n
+    c and cap have shape (m, m) and c >= 0.\n
+    Returns (obj_val, f, phi, theta) where phi and theta are optimal duals of the row and column sum constraints."""
+    m = c.shape[0]
+    num_nodes = 2 * m + 2
+    source = 0
+    rows = np.arange(1, m + 1)
+    cols = np.arange(m + 1, 2 * m + 1)
+    sink = 2 * m + 1
+
+    # residual capacities and arc costs, reverse arcs have negated costs
+    res = np.zeros((num_nodes, num_nodes))
+    cost = np.zeros((num_nodes, num_nodes))
+    if t > eps:
+        res[source, rows] = t
+        res[cols, sink] = t
+    res[np.ix_(rows, cols)] = np.where(cap > eps, cap, 0.)
+    cost[np.ix_(rows, cols)] = c
+    cost[np.ix_(cols, rows)] = -c.T
+
+    potential = np.zeros(num_nodes)
+    cost_tol = 1e-12 * (1. + np.abs(c).max(initial=0.))
+    remaining = m * t if t > eps else 0.
+    while remaining > eps:
+        (dist, pred) = _dijkstra(res=res, cost=cost, potential=potential, eps=eps, start=source)
+        if np.isinf(dist[sink]):
+            raise ValueError('subproblem is infeasible, x_hat is not in the assignment polytope')
+        # the cols whose path through the tree to the sink is a shortest path
+        to_sink = dist[cols] + potential[cols] - potential[sink]
+        ends = cols[(res[cols, sink] > eps) & (to_sink <= dist[sink] + cost_tol)]
+        potential += np.minimum(dist, dist[sink])
+
+        # augment along the tree path of every end, all their arcs have reduced cost 0
+        for end in ends:
+            path = [sink, end]
+            while path[-1] != source:
+                path.append(pred[path[-1]])
+            path = np.array(path[::-1])
+            bottleneck = min(res[path[:-1], path[1:]].min(), remaining)
+            if bottleneck <= eps:
+                continue
+            res[path[:-1], path[1:]] -= bottleneck
+            res[path[1:], path[:-1]] += bottleneck
+            remaining -= bottleneck
+
+    f = np.where(cap > eps, cap, 0.) - res[np.ix_(rows, cols)]
+    obj_val = float((c * f).sum())
+
+    phi = -potential[rows]
+    theta = potential[cols]
+    return (obj_val, f, phi, theta)
+
+
+def _dijkstra(res, cost, potential, eps, start):
+    """Returns (dist, pred) of shortest paths in reduced costs over arcs with residual capacity larger than eps,\n
+    dist is inf and pred is negative for nodes that can not be reached."""
+    # reduced costs are nonnegative up to rounding, which is clipped so dijkstra applies,
+    # the csr matrix is build directly since its explicit zeros are kept as zero cost arcs
+    num_nodes = potential.shape[0]
+    (tails, heads) = np.nonzero(res > eps)
+    arc_cost = np.maximum(cost[tails, heads] + potential[tails] - potential[heads], 0.)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(tails, minlength=num_nodes))])
+    graph = sp.csr_matrix((arc_cost, heads, indptr), shape=(num_nodes, num_nodes))
+    (dist, pred) = csgraph.dijkstra(graph, indices=start, return_predecessors=True)
+    return (dist, pred)
+
+
+class SubProblemFlowDP:
+    """Drop in replacement of disjunctive_programming.SubProblemDP,\n
+    solves the subproblem with solve_transportation instead of gurobi."""
+    def __init__(self, x_hat_val, i: int, j: int, q: np.ndarray):
+        self.i = i
+        self.j = j
+        self.q = q
+        self.n = q.shape[0]
+        # the k's and l's appearing in the subproblem
+        self.ks = np.array([k for k in range(self.n) if k != self.i])
+        self.ls = np.array([l for l in range(self.n) if l != self.j])
+        self.c = np.asarray(q[i][j], dtype=float)[np.ix_(self.ks, self.ls)]
+        self.update_x_hat(x_hat_val)
+
+    def update_x_hat(self, x_hat_val):
+        self.x_hat_val = x_hat_val
+        x_hat_val = np.asarray(x_hat_val)
+        self.cap = x_hat_val[np.ix_(self.ks, self.ls)]
+        self.t = x_hat_val[self.i, self.j]
+
+    def optimize(self):
+        (self.obj_val, f, self.phi, self.theta) = solve_transportation(c=self.c, cap=self.cap, t=self.t)
+        self.x_1 = np.zeros((self.n, self.n))
+        self.x_1[np.ix_(self.ks, self.ls)] = f
+
+    def get_obj_val(self) -> float:
+        return self.obj_val
+
+    def get_duals(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (lamb, theta, phi) the dual multipliers of constraints 1, 2, 3 respectively,\n
+        lamb has shape (n, n), theta and phi have shape (n,),\n
+        entries belonging to k == i or l == j are zero."""
+        lamb = np.zeros((self.n, self.n))
+        lamb[np.ix_(self.ks, self.ls)] = np.minimum(0., self.c - self.phi[:, None] - self.theta[None, :])
+        theta = np.zeros(self.n)
+        theta[self.ls] = self.theta
+        phi = np.zeros(self.n)
+        phi[self.ks] = self.phi
+        return (lamb, theta, phi)
@@ -27,16 +27,39 @@
 # * RLT cuts
 # sum i y[i,j,k,l] = x[k,l] for all j, k, l \in [n],
 # sum j y[i,j,k,l] = x[k,l] for all i, k, l \in [n],
+
+# * reduced model
+# y[i,j,k,l] == y[k,l,i,j], so y is only created for pairs (i,j) < (k,l) (row major),
+# y[i,j,i,j] == x[i,j] * x[i,j] == x[i,j], so x[i,j] is used instead,
+# y[i,j,i,l] == 0 and y[i,j,k,j] == 0 for l != j and k != i by the row and column constraints, so these are left out.
+# This leaves n^2 (n-1)^2 / 2 y variables and
+# objective
+#   sum{i,j} q[i][j][i][j] * x[i,j] + sum{(i,j) < (k,l), i != k, j != l} (q[i][j][k][l] + q[k][l][i][j]) * y[i,j,k,l]
+# McCormick inequalities for the created y, and RLT cuts
+# sum {i not k} y[i,j,k,l] = x[k,l] for all k, l, j not l,
+# sum {j not l} y[i,j,k,l] = x[k,l] for all k, l, i not k,
+# where the cuts with j == l or i == k are left out as they reduce to x[k,l] = x[k,l].
+# All constraints are added in bulk as sparse matrices over the variables [x, y].
+# * sparse model
+# with settings.sparse only y with q[i][j][k][l] + q[k][l][i][j] != 0 are created, the RLT cuts become
+# sum {i not k} y[i,j,k,l] <= x[k,l] over the created y (rows without y are left out), which stays valid,
+# and y[i,j,k,l] >= x[i,j] + x[k,l] - 1 still makes the model exact for binary x.
+# This leaves nnz(A) nnz(B) / 2 y variables at most, at the cost of a weaker relaxation.
 # ruff: noqa: E741
 from settings import SettingsRLT
 import numpy as np
+import scipy.sparse as sp
 import gurobipy as gp
 from gurobipy import GRB
 import checker as ch
+import heuristics as hr
+import symmetry as sy
+from time import time
 
 
 class ReformulationLinearizationTechnique:
     def __init__(self, q, settings: SettingsRLT):
+        build_start = time()
         self.q = q
         self.settings = settings
         self.n = ch.check_q(q=q)
@@ -44,39 +67,50 @@ class ReformulationLinearizationTechnique:
         self.model = gp.Model('Reformulation-Linearization-Technique')
 
         self.add_vars()
-        self.add_y_symmetry_constraints()
         self.add_constraints()
         self.set_objective()
+        self.model.update()
+        self.model._build_time = time() - build_start
 
         self.set_time_limit()
         self.set_threads()
         self.set_soft_mem_limit()
+        hr.set_heuristic_start(model=self.model, x=self.x, q=self.q, time_limit=self.settings.heuristic_time_limit,
+                               cutoff=self.settings.heuristic_cutoff, seed=self.settings.heuristic_seed,
+                               symmetry=self.symmetry)
         
         if self.settings.pre_crush:
             self.model.Params.PreCrush = 1
 
     def add_vars(self):
         self.x = self.model.addVars(self.n, self.n, vtype=GRB.BINARY, name='x')
-
-        self.y = gp.tupledict()
-        for i in range(self.n):
-            for j in range(self.n):
-                for k in range(self.n):
-                    for l in range(self.n):
-                        self.y[i, j, k, l] = self.model.addVar(vtype=GRB.BINARY, name=f'y[{i},{j},{k},{l}]')
-
-    def add_y_symmetry_constraints(self):
-        for i in range(self.n):
-            for j in range(self.n):
-                for k in range(self.n):
-                    for l in range(self.n):
-                        self.model.addConstr(self.y[i, j, k, l] == self.y[k, l, i, j])
-                        # note redundant constraints will be removed in preprocessing
+        self.x_list = [self.x[i, j] for i in range(self.n) for j in range(self.n)]
+
+        # y[r] stands for y[i,j,k,l] and y[k,l,i,j] with (i,j) = divmod(y_a[r], n) and (k,l) = divmod(y_b[r], n)
+        (a, b) = np.triu_indices(self.n * self.n, k=1)
+        (i, j) = np.divmod(a, self.n)
+        (k, l) = np.divmod(b, self.n)
+        keep = (i != k) & (j != l)
+        if self.settings.sparse:
+            keep &= np.asarray(self.q[i, j, k, l] + self.q[k, l, i, j], dtype=float) != 0
+        (self.y_a, self.y_b) = (a[keep], b[keep])
+        self.num_y = self.y_a.shape[0]
+
+        self.y = self.model.addMVar(self.num_y, vtype=GRB.BINARY, name='y')
+        (i, j) = np.divmod(self.y_a, self.n)
+        (k, l) = np.divmod(self.y_b, self.n)
+        self.model.update()
+        self.model.setAttr(GRB.Attr.VarName, self.y.tolist(),
+                           [f'y[{i_},{j_},{k_},{l_}]' for (i_, j_, k_, l_) in zip(i, j, k, l)])
+
+        # all variables in the order of the columns of the constraint matrices
+        self.all_vars = gp.MVar.fromlist(self.x_list + self.y.tolist())
 
     def add_constraints(self):
         self.add_row_and_col_constr()
         self.add_mccormick_ineqs()
         self.add_all_rlt_cuts()
+        self.symmetry = sy.add_symmetry_breaking_constrs(model=self.model, x=self.x, q=self.q, settings=self.settings)
 
     def add_row_and_col_constr(self):
         # sum_{i} x_{i,j} == 1    for all j
@@ -94,55 +128,65 @@ class ReformulationLinearizationTechnique:
                 == 1)
     
     def add_mccormick_ineqs(self):
-        for i in range(self.n):
-            for j in range(self.n):
-                for k in range(self.n):
-                    for l in range(self.n):
-                        self.add_mccormick_ineq(i, j, k, l)
+        # column of y[r] in self.all_vars
+        y_col = self.n * self.n + np.arange(self.num_y)
+        ones = np.ones(self.num_y)
+        rows = np.arange(self.num_y)
+        shape = (self.num_y, self.n * self.n + self.num_y)
 
-    def add_mccormick_ineq(self, i, j, k, l):
         # y[i,j,k,l] <= x[i,j]
-        self.model.addConstr(self.y[i, j, k, l] <= self.x[i, j])
+        coef = sp.csr_matrix((np.concatenate([ones, -ones]), (np.concatenate([rows, rows]), np.concatenate([y_col, self.y_a]))), shape=shape)
+        self.model.addMConstr(coef, self.all_vars, GRB.LESS_EQUAL, np.zeros(self.num_y))
         # y[i,j,k,l] <= x[k,l]
-        self.model.addConstr(self.y[i, j, k, l] <= self.x[k, l])
+        coef = sp.csr_matrix((np.concatenate([ones, -ones]), (np.concatenate([rows, rows]), np.concatenate([y_col, self.y_b]))), shape=shape)
+        self.model.addMConstr(coef, self.all_vars, GRB.LESS_EQUAL, np.zeros(self.num_y))
         # y[i,j,k,l] >= x[i,j] + x[k,l] - 1
-        self.model.addConstr(self.y[i, j, k, l] >= self.x[i, j] + self.x[k, l] - 1)
+        coef = sp.csr_matrix((np.concatenate([ones, -ones, -ones]),
+                              (np.concatenate([rows, rows, rows]), np.concatenate([y_col, self.y_a, self.y_b]))), shape=shape)
+        self.model.addMConstr(coef, self.all_vars, GRB.GREATER_EQUAL, -ones)
         # y[i,j,k,l] >= 0
         # is implied by y being binary
 
     def add_all_rlt_cuts(self):
-        # sum i x[i,j] * x[k,l] = x[k,l] for all j, k, l \in [n],
-        # sum j x[i,j] * x[k,l] = x[k,l] for all i, k, l \in [n],
-        # todo consider not adding cuts where k=i or l=j
-        for j in range(self.n):
-            for k in range(self.n):
-                for l in range(self.n):
-                    self.add_col_rlt_cut(j, k, l)
-        
-        for i in range(self.n):
-            for k in range(self.n):
-                for l in range(self.n):
-                    self.add_row_rlt_cut(i, k, l)
-    
-    def add_col_rlt_cut(self, j, k, l):
-        self.model.addConstr(
-            gp.quicksum(self.y[i, j, k, l] for i in range(self.n))
-            == self.x[k, l]
-        )
-
-    def add_row_rlt_cut(self, i, k, l):
-        self.model.addConstr(
-            gp.quicksum(self.y[i, j, k, l] for j in range(self.n))
-            == self.x[k, l]
-        )
+        # y[r] is both y[i,j,k,l] and y[k,l,i,j] so it appears in two column cuts and two row cuts
+        n = self.n
+        (i, j) = np.divmod(self.y_a, n)
+        (k, l) = np.divmod(self.y_b, n)
+        (fixed, kl) = np.divmod(np.arange(n * n * n), n * n)
+
+        # sum {i not k} y[i,j,k,l] = x[k,l] for all k, l, j not l,  (column cuts, row id (j, k, l))
+        self.add_rlt_cuts(y_rows=np.concatenate([j * n * n + self.y_b, l * n * n + self.y_a]),
+                          keep_rows=fixed != kl % n)
+        # sum {j not l} y[i,j,k,l] = x[k,l] for all k, l, i not k,  (row cuts, row id (i, k, l))
+        self.add_rlt_cuts(y_rows=np.concatenate([i * n * n + self.y_b, k * n * n + self.y_a]),
+                          keep_rows=fixed != kl // n)
+
+    def add_rlt_cuts(self, y_rows: np.ndarray, keep_rows: np.ndarray):
+        """Adds sum {y[r] with y_rows[r] == id} y[r] == x[k,l] for every row id = fixed * n^2 + k * n + l with keep_rows[id],\n
+        y_rows holds the row id of every y occurrence, first for all y[i,j,k,l] then for all y[k,l,i,j]."""
+        n = self.n
+        sense = GRB.EQUAL
+        if self.settings.sparse:
+            # rows without a created y read 0 <= x[k,l]
+            keep_rows = keep_rows & (np.bincount(y_rows, minlength=n * n * n) > 0)
+            sense = GRB.LESS_EQUAL
+        rows = np.flatnonzero(keep_rows)
+        y_col = n * n + np.arange(self.num_y)
+        coef = sp.csr_matrix((np.concatenate([np.ones(2 * self.num_y), -np.ones(rows.shape[0])]),
+                              (np.concatenate([y_rows, rows]), np.concatenate([y_col, y_col, rows % (n * n)]))),
+                             shape=(n * n * n, n * n + self.num_y))[rows]
+        self.model.addMConstr(coef, self.all_vars, sense, np.zeros(rows.shape[0]))
     
     def set_objective(self):
-        # min sum{i,j,k,l \in [n]} q[i][j][k][l] * y[i,j,k,l]
+        # min sum{i,j} q[i][j][i][j] * x[i,j] +
+        #     sum{(i,j) < (k,l), i != k, j != l} (q[i][j][k][l] + q[k][l][i][j]) * y[i,j,k,l]
+        idx = np.arange(self.n)
+        x_cost = np.asarray(self.q[idx[:, None], idx[None, :], idx[:, None], idx[None, :]], dtype=float).ravel()
+        (i, j) = np.divmod(self.y_a, self.n)
+        (k, l) = np.divmod(self.y_b, self.n)
+        y_cost = np.asarray(self.q[i, j, k, l] + self.q[k, l, i, j], dtype=float)
         self.model.ModelSense = GRB.MINIMIZE
-        self.model.setObjective(gp.quicksum(
-            self.q[i][j][k][l] * self.y[i, j, k, l]
-            for i in range(self.n) for j in range(self.n)
-            for k in range(self.n) for l in range(self.n)))
+        self.model.setObjective(self.all_vars @ np.concatenate([x_cost, y_cost]))
         
     def set_time_limit(self):
         if self.settings.time_limit == -1:
@@ -7,12 +7,36 @@ class DPS(Enum):
     ALL_MIPNODES = 'all_mipnodes'
     USER_CUT = 'user_cut'
     LAZY_CONSTR = 'lazy_constr'
+    GUROBI_SP = 'gurobi_sp'
+    FLOW_SP = 'flow_sp'
+    MULTI_CUT = 'multi_cut'
+    SINGLE_CUT = 'single_cut'
+    ROW_CUT = 'row_cut'
+    COLUMN_CUT = 'column_cut'
+    HYBRID_CUT = 'hybrid_cut'
+
+
+class BigM(Enum):
+    SUM = 'sum'
+    LAP = 'lap'
+    SORTED = 'sorted'
 
 
 @dataclass
 class SettingsDP:
     """### Pre Crush
     If pre_crush is set to True then model.Params.PreCrush == 1, preventing some user cuts from getting ignored.\n
+    ### Init With
+    init_with_kbl adds the kbl constraints on w to the master problem.\n
+    init_with_gl adds w[i,j] >= GL[i,j] * x[i,j] with GL[i,j] the Gilmore-Lawler bound of the pair (see bounds.py),\n
+    the minimum cost of the other assignments given x[i,j] == 1.\n
+    init_with_xy links w to O(n^3) product variables y[i,j,k] = x[i,j] * sum {l not j} B[j][l] * x[k,l]\n
+    (see disjunctive_programming.py), it needs q as FactoredQ.\n
+    ### Big M
+    big_m selects the M[i][j] of the kbl constraints of init_with_kbl (see bounds.py), BigM.SUM (default) is the sum of q[i][j],\n
+    BigM.LAP the maximum weight assignment of q[i][j] and BigM.SORTED a sorted product bound on it,\n
+    which needs q as FactoredQ and falls back to BigM.LAP otherwise. BigM.SUM is the formulation of the baseline,\n
+    the tighter bounds change the model, so results with them are not comparable to those of BigM.SUM.\n
     ### Time Limit
     The time_limit setting is in seconds, setting time limit to -1 disables the time limit.\n
     ### Threads
@@ -21,15 +45,90 @@ class SettingsDP:
     ### Soft Memory Limit
     The soft_mem_limit setting changes the memory limit (in GB meaning 10^9 bytes) of gurobi,\n
     for more on soft mem limit see gurobi documentation.\n
+    ### Heuristic
+    heuristic_time_limit, heuristic_cutoff and heuristic_seed set up a tabu search mip start, see heuristics.py.\n
+    ### Symmetry Breaking
+    symmetry_breaking and symmetry_node_limit fix x[i,j] == 0 up to automorphisms of A and B, see symmetry.py.\n
+    ### Order Interchangeable
+    order_interchangeable orders the locations of interchangeable facilities, see facility_ordering.py.\n
+    ### Reuse Subproblems
+    If reuse_subproblems is set to True each subproblem is build once per solve and only its right hand sides are updated,\n
+    this costs memory for n^2 subproblems of size (n-1)^2, set to False to build a new subproblem for every solve.\n
+    Every worker process (see sp_workers) keeps its own subproblems, so memory grows with (sp_workers + 1) * n^4.\n
+    max_reused_subproblems caps the subproblems kept per process, the least recently used one is freed first,\n
+    -1 means no limit.\n
+    ### Subproblem Solver
+    With sp_solver set to DPS.GUROBI_SP subproblems are solved as LP by gurobi,\n
+    with DPS.FLOW_SP they are solved as min cost flow problem by network_flow.py, which also yields optimal duals.\n
+    ### Subproblem Workers
+    Setting sp_workers to a positive number solves the subproblems of a callback in that many worker processes,\n
+    setting sp_workers to 0 solves them in the main process. Time spent in the callback includes waiting for the workers.\n
+    ### Integral Fast Path
+    If integral_fast_path is set to True and x_hat is a permutation matrix, all w_bar are computed in one vectorized step\n
+    and only violated pairs get a cut. With analytic_duals set to True these cuts use a closed form dual,\n
+    otherwise their duals come from the subproblem solver.\n
+    ### Cut Pool
+    If cut_pool is set to True added cuts are remembered by (i, j) and their coefficients rounded to cut_pool_decimals,\n
+    user cuts that are already in the pool are not added again. Lazy constraints are always added,\n
+    since gurobi may pass solutions that violate earlier lazy constraints, but hits are counted for both.\n
+    ### Cut Filter
+    Violated cuts are scored by relative violation (w_bar - w_hat) / max(1, |w_bar|)\n
+    and efficacy, the euclidean distance of (x_hat, w_hat) to the cut.\n
+    Cuts with a relative violation below min_relative_violation or an efficacy below min_efficacy are rejected,\n
+    of the remaining cuts at most max_cuts_per_callback with the highest efficacy are added, -1 means no limit.\n
+    Rejected cuts are counted in model._rejected_cut_info. Note with lazy constraints a rejected cut can let\n
+    an integer solution with w[i,j] up to the thresholds below w_bar[i,j] be accepted, keep the thresholds small.\n
+    ### Cut Aggregation
+    With cut_aggregation set to DPS.MULTI_CUT every violated pair (i, j) gets its own cut on w[i,j],\n
+    DPS.SINGLE_CUT sums the cuts of a callback into one cut on the sum of their w, DPS.ROW_CUT sums them per row i\n
+    and DPS.COLUMN_CUT per column j. DPS.HYBRID_CUT uses DPS.MULTI_CUT until the cut pool (or without cut pool\n
+    the number of added cuts) holds hybrid_cut_threshold cuts and DPS.SINGLE_CUT after that.\n
+    Aggregated cuts are scored, pooled and counted in model._cut_info as one cut, with i or j -1 for the summed index.\n
+    ### Tracing
+    If trace is set to True the build, the callback phases and every subproblem are timed as named spans (see tracing.py),\n
+    create_txt writes the count, total, mean and max time per span. With trace_events also set to True every span\n
+    is kept and create_txt writes them as chrome trace json, which grows with the number of subproblems solved.\n
+    ### Telemetry
+    model._callback_info, model._cut_info and model._rejected_cut_info keep at most telemetry_capacity rows in memory,\n
+    when full or after telemetry_flush_interval seconds the rows are appended to files in telemetry_dir,\n
+    so their memory stays constant and the rows of a crashed run can be read with telemetry.read_telemetry.\n
+    When telemetry_dir is empty a temporary directory is used, its files are removed after create_txt read them\n
+    and the directory is removed at the latest when the process exits.\n
     ### Debug
     Keep all debug settings at there default unless you know what you are doing."""
     x_is_bin: bool = True
     init_with_kbl: bool = True
     init_with_xy: bool = False
+    init_with_gl: bool = False
+    big_m: str = BigM.SUM
     callback_at: str = DPS.ALL_MIPSOLS
     bd_constr_type: str = DPS.LAZY_CONSTR
     pre_crush: bool = True
     minimum_w_difference: float = 0.
+    reuse_subproblems: bool = True
+    max_reused_subproblems: int = -1
+    sp_solver: str = DPS.GUROBI_SP
+    sp_workers: int = 0
+    integral_fast_path: bool = False
+    analytic_duals: bool = False
+    cut_pool: bool = False
+    cut_pool_decimals: int = 6
+    min_relative_violation: float = 0.
+    min_efficacy: float = 0.
+    max_cuts_per_callback: int = -1
+    cut_aggregation: str = DPS.MULTI_CUT
+    hybrid_cut_threshold: int = 1000
+    trace: bool = False
+    trace_events: bool = False
+    telemetry_dir: str = ''
+    telemetry_capacity: int = 4096
+    telemetry_flush_interval: float = 10.
+    heuristic_time_limit: float = 0.
+    heuristic_cutoff: bool = False
+    heuristic_seed: int = 0
+    symmetry_breaking: bool = False
+    symmetry_node_limit: int = 1000
+    order_interchangeable: bool = False
     time_limit: float = -1
     threads: int = -1
     soft_mem_limit: int = -1
@@ -42,6 +141,11 @@ class SettingsDP:
 class SettingsKBL:
     """### Pre Crush
     If pre_crush is set to True then model.Params.PreCrush == 1, preventing some user cuts from getting ignored.\n
+    ### Big M
+    big_m selects the M[i][j] of the kbl constraints on w (see bounds.py), BigM.SUM (default) is the sum of q[i][j],\n
+    BigM.LAP the maximum weight assignment of q[i][j] and BigM.SORTED a sorted product bound on it,\n
+    which needs q as FactoredQ and falls back to BigM.LAP otherwise. BigM.SUM is the formulation of the baseline,\n
+    the tighter bounds change the model, so results with them are not comparable to those of BigM.SUM.\n
     ### Time Limit
     The time_limit setting is in seconds, setting time limit to -1 disables the time limit.\n
     ### Threads
@@ -49,8 +153,21 @@ class SettingsKBL:
     in order to allow for fair comparison between methods it might be best to set threads to 1.\n
     ### Soft Memory Limit
     The soft_mem_limit setting changes the memory limit (in GB meaning 10^9 bytes) of gurobi,\n
-    for more on soft mem limit see gurobi documentation."""
+    for more on soft mem limit see gurobi documentation.\n
+    ### Heuristic
+    heuristic_time_limit, heuristic_cutoff and heuristic_seed set up a tabu search mip start, see heuristics.py.\n
+    ### Symmetry Breaking
+    symmetry_breaking and symmetry_node_limit fix x[i,j] == 0 up to automorphisms of A and B, see symmetry.py.\n
+    ### Order Interchangeable
+    order_interchangeable orders the locations of interchangeable facilities, see facility_ordering.py."""
     pre_crush: bool = True
+    big_m: str = BigM.SUM
+    heuristic_time_limit: float = 0.
+    heuristic_cutoff: bool = False
+    heuristic_seed: int = 0
+    symmetry_breaking: bool = False
+    symmetry_node_limit: int = 1000
+    order_interchangeable: bool = False
     time_limit: float = -1
     threads: int = -1
     soft_mem_limit: int = -1
@@ -60,6 +177,9 @@ class SettingsKBL:
 class SettingsRLT:
     """### Pre Crush
     If pre_crush is set to True then model.Params.PreCrush == 1, preventing some user cuts from getting ignored.\n
+    ### Sparse
+    If sparse is set to True y is only created for pairs with nonzero cost and the RLT cuts become <= cuts\n
+    (see reformulation_linearization_technique.py), the model size scales with nnz(A) nnz(B) but its relaxation is weaker.\n
     ### Time Limit
     The time_limit setting is in seconds, setting time limit to -1 disables the time limit.\n
     ### Threads
@@ -67,9 +187,22 @@ class SettingsRLT:
     in order to allow for fair comparison between methods it might be best to set threads to 1.\n
     ### Soft Memory Limit
     The soft_mem_limit setting changes the memory limit (in GB meaning 10^9 bytes) of gurobi,\n
-    for more on soft mem limit see gurobi documentation."""
+    for more on soft mem limit see gurobi documentation.\n
+    ### Heuristic
+    heuristic_time_limit, heuristic_cutoff and heuristic_seed set up a tabu search mip start, see heuristics.py.\n
+    ### Symmetry Breaking
+    symmetry_breaking and symmetry_node_limit fix x[i,j] == 0 up to automorphisms of A and B, see symmetry.py.\n
+    ### Order Interchangeable
+    order_interchangeable orders the locations of interchangeable facilities, see facility_ordering.py."""
     pre_crush: bool = True
+    sparse: bool = False
     write_to_lp: bool = False
+    heuristic_time_limit: float = 0.
+    heuristic_cutoff: bool = False
+    heuristic_seed: int = 0
+    symmetry_breaking: bool = False
+    symmetry_node_limit: int = 1000
+    order_interchangeable: bool = False
     time_limit: float = -1
     threads: int = -1
     soft_mem_limit: int = -1
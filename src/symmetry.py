@@ -0,0 +1,184 @@
+# * symmetry of a qap instance
+# a permutation sigma of the locations is an automorphism of A when A[sigma[i]][sigma[k]] == A[i][k] for all i, k,
+# then for every permutation perm (location i gets facility perm[i]) the permutation perm' with perm'[sigma[i]] = perm[i]
+# has the same cost, similarly tau with B[tau[j]][tau[l]] == B[j][l] for all j, l maps perm to tau[perm].
+# * detection
+# colour refinement on the weighted graph of A (or B) splits the locations into cells that contain the orbits,
+# for every location v of a cell an automorphism sigma with sigma[v] == r is searched for every orbit representative r
+# already found in the cell, by individualization of v and r followed by colour refinement and backtracking.
+# When it is found v is in the orbit of r and sigma is stored as transversal, otherwise v is a new representative.
+# A search stopped by node_limit only leaves orbits split, so the orbits found are always true (possibly partial) orbits.
+# * symmetry breaking
+# every permutation is mapped by a transversal of A to one where facility 0 is at an orbit representative,
+# so x[i,0] == 0 for all i that are not a representative of their orbit of A,
+# or, by a transversal of B, location 0 gets a facility that is a representative of its orbit of B,
+# so x[0,j] == 0 for all j that are not a representative of their orbit of B.
+# Only one of both is used, the one that fixes more variables, since together they need not be valid.
+# * settings
+# symmetry_breaking adds these constraints (add_symmetry_breaking_constrs), it needs q as FactoredQ,
+# symmetry_node_limit bounds the search nodes per automorphism, a search that hits it only finds fewer symmetries.
+# The model keeps the original labelling, so solutions are checked by the checker as before.
+import numpy as np
+import gurobipy as gp
+import checker as ch
+import data_handler as dh
+import facility_ordering as fo
+from time import time
+
+
+class SymmetryBreaking:
+    def __init__(self, A: np.ndarray, B: np.ndarray, node_limit: int):  # noqa: N803
+        (rep_A, transversal_A) = orbit_transversal(C=np.asarray(A), node_limit=node_limit)  # noqa: N806
+        (rep_B, transversal_B) = orbit_transversal(C=np.asarray(B), node_limit=node_limit)  # noqa: N806
+        self.n = rep_A.shape[0]
+        # on_locations is True when the orbits of the locations (A) are used and False for the facilities (B)
+        self.on_locations = bool((rep_A != np.arange(self.n)).sum() >= (rep_B != np.arange(self.n)).sum())
+        (self.rep, self.transversal) = (rep_A, transversal_A) if self.on_locations else (rep_B, transversal_B)
+        self.num_orbits_A = np.unique(rep_A).shape[0]
+        self.num_orbits_B = np.unique(rep_B).shape[0]
+
+    def zero_pairs(self) -> list[tuple[int, int]]:
+        """Returns the pairs (i, j) with x[i,j] == 0 in every canonical permutation"""
+        non_reps = np.flatnonzero(self.rep != np.arange(self.n)).tolist()
+        if self.on_locations:
+            return [(i, 0) for i in non_reps]
+        return [(0, j) for j in non_reps]
+
+    def canonical_permutation(self, perm: np.ndarray) -> np.ndarray:
+        """Returns a permutation with the same cost as perm that satisfies the symmetry breaking constraints"""
+        perm = np.asarray(perm)
+        if self.on_locations:
+            # facility 0 moves from location i to sigma[i] == rep[i]
+            i = int(np.flatnonzero(perm == 0)[0])
+            if i not in self.transversal:
+                return perm
+            canonical = np.empty_like(perm)
+            canonical[self.transversal[i]] = perm
+            return canonical
+        # the facility perm[0] at location 0 is replaced by tau[perm[0]] == rep[perm[0]]
+        j = int(perm[0])
+        if j not in self.transversal:
+            return perm
+        return self.transversal[j][perm]
+
+
+def add_symmetry_breaking_constrs(model: gp.Model, x, q, settings) -> SymmetryBreaking | fo.InterchangeableFacilities | None:
+    """Adds the constraints of add_orbit_constrs when settings.symmetry_breaking is True or those of\n
+    facility_ordering.add_ordering_constrs when settings.order_interchangeable is True (not both),\n
+    settings is a SettingsKBL, SettingsDP or SettingsRLT. Returns the object used to map the heuristic start\n
+    to a permutation that satisfies the constraints (see heuristics.set_heuristic_start), or None."""
+    if settings.symmetry_breaking and settings.order_interchangeable:
+        raise ValueError('symmetry_breaking and order_interchangeable settings can not both be True')
+    if settings.symmetry_breaking:
+        return add_orbit_constrs(model=model, x=x, q=q, node_limit=settings.symmetry_node_limit)
+    if settings.order_interchangeable:
+        n = q.shape[0]
+        return fo.add_ordering_constrs(model=model, x_list=[x[i, j] for i in range(n) for j in range(n)], q=q)
+    return None
+
+
+def add_orbit_constrs(model: gp.Model, x, q, node_limit: int) -> SymmetryBreaking | None:
+    """Detects the symmetry of the instance and adds x[i,j] == 0 for the pairs of SymmetryBreaking.zero_pairs,\n
+    stores the number of fixed x, the number of orbits of A and B and the detection time in\n
+    model._symmetry_num_fixed, model._symmetry_num_orbits and model._symmetry_time.\n
+    Returns the SymmetryBreaking, or None when q is not a FactoredQ since the detection needs A and B."""
+    model._symmetry_num_fixed = 0
+    model._symmetry_num_orbits = None
+    model._symmetry_time = 0.
+    if not isinstance(q, dh.FactoredQ):
+        print('symmetry breaking skipped, it needs q as FactoredQ (A and B)')
+        return None
+    start = time()
+    symmetry = SymmetryBreaking(A=q.A, B=q.B, node_limit=node_limit)
+    pairs = symmetry.zero_pairs()
+    model.addConstrs((x[i, j] == 0 for (i, j) in pairs), name='constr_symmetry_breaking')
+    model._symmetry_num_fixed = len(pairs)
+    model._symmetry_num_orbits = (symmetry.num_orbits_A, symmetry.num_orbits_B)
+    model._symmetry_time = time() - start
+    return symmetry
+
+
+def orbit_transversal(C: np.ndarray, node_limit: int) -> tuple[np.ndarray, dict[int, np.ndarray]]:  # noqa: N803
+    """Returns (rep, transversal) with rep[v] the smallest vertex of the orbit of v found and for every v != rep[v]\n
+    an automorphism transversal[v] of C with transversal[v][v] == rep[v]."""
+    n = C.shape[0]
+    edge_labels = edge_label_matrix(C)
+    colors = refine(edge_labels=edge_labels, colors=np.unique(np.diag(C), return_inverse=True)[1].reshape(-1, n))[0]
+    rep = np.arange(n)
+    transversal = {}
+    for cell_color in np.unique(colors):
+        reps_in_cell = []
+        for v in np.flatnonzero(colors == cell_color).tolist():
+            for r in reps_in_cell:
+                sigma = find_automorphism(C=C, edge_labels=edge_labels, colors=colors, v=v, r=r, node_limit=node_limit)
+                if sigma is not None:
+                    (rep[v], transversal[v]) = (r, sigma)
+                    break
+            else:
+                reps_in_cell.append(v)
+    return (rep, transversal)
+
+
+def edge_label_matrix(C: np.ndarray) -> np.ndarray:  # noqa: N803
+    """Returns the (n, n) int matrix with equal labels for equal pairs (C[v][u], C[u][v]), -1 on the diagonal"""
+    n = C.shape[0]
+    pairs = np.stack([C.ravel(), C.T.ravel()], axis=1)
+    labels = np.unique(pairs, axis=0, return_inverse=True)[1].reshape(n, n)
+    np.fill_diagonal(labels, -1)
+    return labels
+
+
+def refine(edge_labels: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """Colour refinement of the rows of colors, (m, n) colourings of the same graph, until the number of colours is stable,\n
+    colours are ids of the sorted (colour, sorted (edge label, neighbour colour)) signatures over all m colourings,\n
+    so they are comparable between the colourings."""
+    (m, n) = colors.shape
+    num_colors = np.unique(colors).shape[0]
+    while True:
+        keys = edge_labels[None, :, :] * (int(colors.max()) + 1) + colors[:, None, :]
+        keys[:, np.arange(n), np.arange(n)] = -1
+        signatures = np.concatenate([colors[:, :, None], np.sort(keys, axis=2)], axis=2).reshape(m * n, n + 1)
+        colors = np.unique(signatures, axis=0, return_inverse=True)[1].reshape(m, n)
+        new_num_colors = np.unique(colors).shape[0]
+        if new_num_colors == num_colors:
+            return colors
+        num_colors = new_num_colors
+
+
+def find_automorphism(C: np.ndarray, edge_labels: np.ndarray, colors: np.ndarray,  # noqa: N803, PLR0913, PLR0917
+                      v: int, r: int, node_limit: int) -> np.ndarray | None:
+    """Returns an automorphism sigma of C with sigma[v] == r, where colors is a stable colouring of C,\n
+    or None when there is none or none was found within node_limit search nodes."""
+    budget = [node_limit]
+    return search(C=C, edge_labels=edge_labels, src=individualize(colors, v), dst=individualize(colors, r), budget=budget)
+
+
+def individualize(colors: np.ndarray, v: int) -> np.ndarray:
+    """Returns a copy of the colouring colors with v in a new singleton colour"""
+    colors = colors.copy()
+    colors[v] = colors.max() + 1
+    return colors
+
+
+def search(C: np.ndarray, edge_labels: np.ndarray, src: np.ndarray, dst: np.ndarray, budget: list[int]) -> np.ndarray | None:  # noqa: N803
+    """Backtracking search of an automorphism mapping the colour classes of src on those of dst, see find_automorphism"""
+    budget[0] -= 1
+    if budget[0] < 0:
+        return None
+    (src, dst) = refine(edge_labels=edge_labels, colors=np.stack([src, dst]))
+    counts = np.bincount(src, minlength=int(max(src.max(), dst.max())) + 1)
+    if not np.array_equal(counts, np.bincount(dst, minlength=counts.shape[0])):
+        return None
+    if counts.max() == 1:
+        sigma = np.empty_like(src)
+        sigma[np.argsort(src)] = np.argsort(dst)
+        return sigma if ch.is_automorphism(perm=sigma, C=C) else None
+    cell_color = np.flatnonzero(counts > 1)[0]
+    v = np.flatnonzero(src == cell_color)[0]
+    for u in np.flatnonzero(dst == cell_color):
+        sigma = search(C=C, edge_labels=edge_labels, src=individualize(src, v), dst=individualize(dst, u), budget=budget)
+        if sigma is not None:
+            return sigma
+        if budget[0] < 0:
+            return None
+    return None
@@ -0,0 +1,112 @@
+# this document contains bounded memory telemetry buffers
+# a TelemetryBuffer keeps at most capacity rows in a preallocated structured numpy array,
+# when it is full, or flush_interval seconds passed since the last flush, the rows are appended
+# as raw records to file_path and the buffer starts over (a ring buffer emptied by flushing).
+# Next to file_path a json sidecar holds the columns and dtypes, so read_telemetry can read the records
+# of a run that crashed, losing at most the rows of the last unflushed chunk.
+# Files in a temporary directory (no telemetry_dir given) are removed once create_txt has read them,
+# the temporary directories left (tables never read) are removed when the process exits.
+import os
+import json
+import atexit
+import shutil
+import tempfile
+import datetime
+import itertools
+import numpy as np
+from time import time
+
+# (column, dtype) of the tables of the disjunctive programming callback
+CALLBACK_INFO_COLUMNS = [('_benders_started_count', np.int64), ('_callback_call_count', np.int64),
+                         ('cuts_added_this_callback', np.int64), ('time_since_init', np.float64),
+                         ('time_spent_in_this_cb', np.float64), ('cut_pool_hits_this_callback', np.int64),
+                         ('cuts_rejected_this_callback', np.int64)]
+CUT_INFO_COLUMNS = [('cut_number', np.int64), ('_benders_started_count', np.int64), ('w_difference', np.float64),
+                    ('i', np.int64), ('j', np.int64)]
+REJECTED_CUT_INFO_COLUMNS = [('rejected_cut_number', np.int64), ('_benders_started_count', np.int64),
+                             ('w_difference', np.float64), ('rel_violation', np.float64), ('efficacy', np.float64),
+                             ('i', np.int64), ('j', np.int64)]
+
+# numbers the solves of this process, so prefixes created within the same second differ
+_prefix_counter = itertools.count(1)
+
+# the temporary directories created by telemetry_file_prefix
+_temporary_dirs = set()
+
+
+class TelemetryBuffer:
+    """Append only table of typed rows, at most capacity rows are held in memory,\n
+    the rest is flushed to file_path in chunks."""
+    def __init__(self, file_path: str, columns: list[tuple[str, type]], capacity: int, flush_interval: float):
+        self.file_path = file_path
+        self.dtype = np.dtype(columns)
+        self.buffer = np.zeros(capacity, dtype=self.dtype)
+        self.count = 0
+        self.num_flushed = 0
+        self.flush_interval = flush_interval
+        self.last_flush = time()
+
+        with open(file_path + '.json', 'w') as f:
+            json.dump({'columns': [column for (column, _) in columns],
+                       'dtypes': [np.dtype(dtype).str for (_, dtype) in columns]}, f)
+        # create the (empty) data file, so partial logs are found even before the first flush
+        open(file_path, 'wb').close()
+
+    def append(self, row: tuple):
+        self.buffer[self.count] = row
+        self.count += 1
+        if self.count == self.buffer.shape[0] or time() - self.last_flush > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Appends the buffered rows to file_path and empties the buffer"""
+        if self.count > 0:
+            with open(self.file_path, 'ab') as f:
+                f.write(self.buffer[:self.count].tobytes())
+            self.num_flushed += self.count
+            self.count = 0
+        self.last_flush = time()
+
+    def __len__(self) -> int:
+        return self.num_flushed + self.count
+
+    def read(self) -> np.ndarray:
+        """Flushes and returns all rows as structured array"""
+        self.flush()
+        return read_telemetry(self.file_path)
+
+
+def read_telemetry(file_path: str) -> np.ndarray:
+    """Returns the records of a telemetry file as structured array, a partially written last record is dropped"""
+    with open(file_path + '.json') as f:
+        sidecar = json.load(f)
+    dtype = np.dtype(list(zip(sidecar['columns'], sidecar['dtypes'])))
+    num_records = os.path.getsize(file_path) // dtype.itemsize
+    return np.fromfile(file_path, dtype=dtype, count=num_records)
+
+
+def telemetry_file_prefix(telemetry_dir: str, model_name: str) -> str:
+    """Returns a unique path prefix for the telemetry files of one solve in telemetry_dir,\n
+    when telemetry_dir is empty a new temporary directory is used."""
+    if not telemetry_dir:
+        telemetry_dir = tempfile.mkdtemp(prefix='qap_telemetry_')
+        _temporary_dirs.add(telemetry_dir)
+        atexit.register(shutil.rmtree, telemetry_dir, ignore_errors=True)
+    os.makedirs(telemetry_dir, exist_ok=True)
+    current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    return os.path.join(telemetry_dir, f'{model_name}_{current_datetime}_pid{os.getpid()}_{next(_prefix_counter)}')
+
+
+def remove_if_temporary(telemetry_buffer: TelemetryBuffer) -> bool:
+    """Removes the files of telemetry_buffer when they are in a temporary directory of telemetry_file_prefix,\n
+    the directory is removed with its last files. Returns True when the files were removed."""
+    telemetry_dir = os.path.dirname(telemetry_buffer.file_path)
+    if telemetry_dir not in _temporary_dirs:
+        return False
+    for file_path in (telemetry_buffer.file_path, telemetry_buffer.file_path + '.json'):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    if not os.listdir(telemetry_dir):
+        os.rmdir(telemetry_dir)
+        _temporary_dirs.discard(telemetry_dir)
+    return True
@@ -0,0 +1,98 @@
+# this document contains a light weight tracer, used to time the phases of a solve
+# usage
+#   tracer = Tracer(enabled=True, record_events=True)
+#   with tracer.span('callback/separate'):
+#       ...
+# every span adds to the counters of its name (count, total time, max time),
+# with record_events each span is also kept as event for export as chrome trace,
+# which can be opened in chrome://tracing or https://ui.perfetto.dev.
+# When the tracer is disabled span returns one shared no-op context manager.
+import os
+import json
+from time import perf_counter_ns
+
+
+class Tracer:
+    """Aggregates the time spent in named spans,\n
+    names use / to group spans e.g. build/add_variables, callback/separate."""
+    def __init__(self, enabled: bool, record_events: bool = False, max_events: int = 1_000_000):
+        self.enabled = enabled
+        self.record_events = enabled and record_events
+        self.max_events = max_events
+        # name -> [count, total_ns, max_ns]
+        self.counters = {}
+        # (name, start_ns, duration_ns)
+        self.events = []
+        self.dropped_events = 0
+        self.origin_ns = perf_counter_ns()
+
+    def span(self, name: str):
+        """Returns a context manager timing its body as span name"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(tracer=self, name=name)
+
+    def record(self, name: str, start_ns: int, stop_ns: int):
+        duration_ns = stop_ns - start_ns
+        counter = self.counters.get(name)
+        if counter is None:
+            self.counters[name] = [1, duration_ns, duration_ns]
+        else:
+            counter[0] += 1
+            counter[1] += duration_ns
+            if duration_ns > counter[2]:
+                counter[2] = duration_ns
+        if self.record_events:
+            if len(self.events) < self.max_events:
+                self.events.append((name, start_ns, duration_ns))
+            else:
+                self.dropped_events += 1
+
+    def summary(self) -> list[tuple[str, int, float, float, float]]:
+        """Returns a list of (name, count, total_time, mean_time, max_time) sorted by name, times in seconds"""
+        return [(name, count, total_ns / 1e9, total_ns / count / 1e9, max_ns / 1e9)
+                for (name, (count, total_ns, max_ns)) in sorted(self.counters.items())]
+
+    def write_chrome_trace(self, file_path: str):
+        """Writes the recorded events in the chrome trace event format (complete events, times in microseconds)"""
+        pid = os.getpid()
+        trace_events = [{'name': name,
+                         'cat': name.split('/')[0],
+                         'ph': 'X',
+                         'ts': (start_ns - self.origin_ns) / 1e3,
+                         'dur': duration_ns / 1e3,
+                         'pid': pid,
+                         'tid': 0}
+                        for (name, start_ns, duration_ns) in self.events]
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': trace_events,
+                       'displayTimeUnit': 'ms',
+                       'otherData': {'dropped_events': self.dropped_events}}, f)
+
+
+class _Span:
+    __slots__ = ('name', 'start_ns', 'tracer')
+
+    def __init__(self, tracer: Tracer, name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start_ns = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.record(name=self.name, start_ns=self.start_ns, stop_ns=perf_counter_ns())
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
@@ -1,8 +1,11 @@
 # ruff: noqa: SLF001
 import datetime
 import gurobipy as gp
+from gurobipy import GRB
+import numpy as np
 import os
 import pandas as pd
+import telemetry as tm
 
 
 def create_txt(model: gp.Model, output_folder_path: str,  # noqa: PLR0913, PLR0917, C901, PLR0915
@@ -11,13 +14,20 @@ def create_txt(model: gp.Model, output_folder_path: str,  # noqa: PLR0913, PLR09
     current_datetime = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
     file_name = f'output_{current_datetime}'
     
-    # prevent overwriting existing file
+    # prevent overwriting existing file,
+    # opening with 'x' fails when another process created the same file in the meantime, then the next run is tried
     run = 1
-    while os.path.exists(output_folder_path + file_name + f'_r{run}' + '.txt'):
-        run += 1
+    while True:
+        while os.path.exists(output_folder_path + file_name + f'_r{run}' + '.txt'):
+            run += 1
+        try:
+            f = open(output_folder_path + file_name + f'_r{run}' + '.txt', 'x')  # noqa: SIM115
+            break
+        except FileExistsError:
+            run += 1
     file_name += f'_r{run}'
 
-    with open(output_folder_path + file_name + '.txt', 'x') as f:
+    with f:
         f.write('Output file:\n')
         f.write(f'model.ModelName: {model.ModelName}\n')
         f.write(f'instance_name: {instance_name}\n')
@@ -42,6 +52,17 @@ def create_txt(model: gp.Model, output_folder_path: str,  # noqa: PLR0913, PLR09
         f.write(f'model.ObjVal: {model.ObjVal}\n')
         f.write(f'model.ObjBound: {model.ObjBound}\n')
         f.write(f'model.ObjBoundC: {model.ObjBoundC}\n') # gave error in the past todo reproduce error
+        if hasattr(model, '_heuristic_obj_val'):
+            f.write(f'model._heuristic_obj_val: {model._heuristic_obj_val}\n')
+            f.write(f'model._heuristic_time: {model._heuristic_time}\n')
+        if hasattr(model, '_symmetry_num_fixed'):
+            f.write(f'model._symmetry_num_fixed: {model._symmetry_num_fixed}\n')
+            f.write(f'model._symmetry_num_orbits: {model._symmetry_num_orbits}\n')
+            f.write(f'model._symmetry_time: {model._symmetry_time}\n')
+        if hasattr(model, '_ordering_num_facilities'):
+            f.write(f'model._ordering_num_facilities: {model._ordering_num_facilities}\n')
+            f.write(f'model._ordering_num_constrs: {model._ordering_num_constrs}\n')
+            f.write(f'model._ordering_time: {model._ordering_time}\n')
 
         f.write(f'\nextra_info: {extra_info}\n')
 
@@ -57,34 +78,54 @@ def create_txt(model: gp.Model, output_folder_path: str,  # noqa: PLR0913, PLR09
             f.write(f'model._benders_started_count: {model._benders_started_count}\n')
             f.write(f'model._total_time_in_user_cb: {model._total_time_in_user_cb}\n')
             f.write(f'model._total_num_cuts: {model._total_num_cuts}\n')
+            f.write(f'model._total_num_rejected_cuts: {model._total_num_rejected_cuts}\n')
+            if model._cut_pool is not None:
+                f.write(f'model._cut_pool.hits: {model._cut_pool.hits}\n')
+                f.write(f'model._cut_pool.size(): {model._cut_pool.size()}\n')
 
-            # * callback info
-            # write to txt
-            f.write('model._callback_info:\n')
-            f.write('(_benders_started_count, _callback_call_count, cuts_added_this_callback, time_since_init, time_spent_in_this_cb)\n')
-            for tup in model._callback_info:
-                f.write(f'{tup}\n')
-            # pandas
-            callback_info_columns =\
-                ['_benders_started_count', '_callback_call_count', 'cuts_added_this_callback', 'time_since_init', 'time_spent_in_this_cb']
-            df_callback_info = pd.DataFrame(model._callback_info, columns=callback_info_columns)
-            df_callback_info.to_csv(output_folder_path + file_name + '_callback_info.csv', index=False, sep=';')
-            
-            # * cut info
-            # write to txt
-            f.write('\nmodel._cut_info:\n')
-            f.write('(cut_number, _benders_started_count, -w_hat_val[i, j] + w_bar_val[i, j], i, j)\n')
-            for tup in model._cut_info:
-                f.write(f'{tup}\n')
-            # pandas
-            cut_info_columns =\
-                ['cut_number', '_benders_started_count', 'w_difference', 'i', 'j']
-            df_cut_info = pd.DataFrame(model._cut_info, columns=cut_info_columns)
-            df_cut_info.to_csv(output_folder_path + file_name + '_cut_info.csv', index=False, sep=';')
+            # * callback, cut and rejected cut info
+            # read from the telemetry files and written as compressed columnar npz files, see read_table
+            tables = [('_callback_info', model._callback_info),
+                      ('_cut_info', model._cut_info),
+                      ('_rejected_cut_info', model._rejected_cut_info)]
+            for (table_name, telemetry_buffer) in tables:
+                data = telemetry_buffer.read()
+                write_table(output_folder_path + file_name + table_name + '.npz', data=data)
+                f.write(f'model.{table_name}: {len(data)} rows written to {file_name + table_name}.npz')
+                if tm.remove_if_temporary(telemetry_buffer):
+                    f.write('\n')
+                else:
+                    f.write(f', telemetry file {telemetry_buffer.file_path}\n')
+                f.write(f'({", ".join(data.dtype.names)})\n')
+
+            # * trace
+            if model._tracer.enabled:
+                # write to txt
+                f.write('\nmodel._tracer.summary():\n')
+                f.write('(span, count, total_time, mean_time, max_time)\n')
+                for tup in model._tracer.summary():
+                    f.write(f'{tup}\n')
+                if model._tracer.record_events:
+                    model._tracer.write_chrome_trace(output_folder_path + file_name + '_trace.json')
 
         # write solution
         f.write('\nnon zero variables\n')
         f.write('var.VarName, var.X:\n')
-        for var in model.getVars():
-            if var.X != 0:
-                f.write(f'{var.VarName},      {var.X}\n')
+        # one bulk query for all values, names only for the non zeros
+        all_vars = model.getVars()
+        x_vals = np.array(model.getAttr(GRB.Attr.X, all_vars))
+        non_zero = np.flatnonzero(x_vals)
+        names = model.getAttr(GRB.Attr.VarName, [all_vars[k] for k in non_zero])
+        f.writelines(f'{name},      {x_val}\n' for (name, x_val) in zip(names, x_vals[non_zero].tolist()))
+
+
+def write_table(file_path: str, data: np.ndarray) -> None:
+    """Writes the structured array data to a compressed npz file, one typed array per column,\n
+    so no intermediate text or data frame of the whole table is build."""
+    np.savez_compressed(file_path, **{column: data[column] for column in data.dtype.names})
+
+
+def read_table(file_path: str) -> pd.DataFrame:
+    """Reads a table written by write_table"""
+    with np.load(file_path) as npz:
+        return pd.DataFrame({column: npz[column] for column in npz.files})
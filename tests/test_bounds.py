@@ -0,0 +1,36 @@
+import itertools
+import numpy as np
+import pytest
+import bounds as bd
+import data_handler as dh
+from settings import BigM
+
+
+def max_sums(A: np.ndarray, B: np.ndarray, exclude_diagonal: bool) -> np.ndarray:  # noqa: N803
+    """Returns the (n, n) maximum over all permutations with perm[i] != j of sum {k} A[i][k] * B[j][perm[k]],\n
+    with exclude_diagonal only over k not i and perm[k] not j, by brute force."""
+    n = A.shape[0]
+    maximum = np.full((n, n), -np.inf)
+    for perm in itertools.permutations(range(n)):
+        perm = np.array(perm)
+        for i in range(n):
+            for j in range(n):
+                if perm[i] == j:
+                    continue
+                active = (np.arange(n) != i) & (perm != j) if exclude_diagonal else np.ones(n, dtype=bool)
+                maximum[i, j] = max(maximum[i, j], (A[i, active] * B[j, perm[active]]).sum())
+    return maximum
+
+
+@pytest.mark.parametrize(('method', 'low'), [(BigM.SUM, 0), (BigM.LAP, 0), (BigM.SORTED, 0),
+                                             (BigM.LAP, -3), (BigM.SORTED, -3)])
+@pytest.mark.parametrize('exclude_diagonal', [False, True])
+@pytest.mark.parametrize('dense', [False, True])
+@pytest.mark.parametrize(('n', 'seed'), [(3, 0), (4, 1), (5, 2), (6, 3)])
+def test_big_m_is_upper_bound(method, low, exclude_diagonal, dense, n, seed):  # noqa: PLR0913, PLR0917
+    # BigM.SUM only bounds nonnegative q, BigM.LAP and BigM.SORTED also negative entries
+    rng = np.random.default_rng(seed)
+    (A, B) = (rng.integers(low, 10, (n, n)), rng.integers(low, 10, (n, n)))  # noqa: N806
+    q = dh.AB_to_q(A, B) if dense else dh.FactoredQ(A=A, B=B)
+    M = bd.big_m(q=q, method=method, exclude_diagonal=exclude_diagonal)  # noqa: N806
+    assert (M >= max_sums(A=A, B=B, exclude_diagonal=exclude_diagonal) - 1e-9).all()
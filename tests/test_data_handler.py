@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+import data_handler as dh
+
+
+@pytest.fixture(params=[(2, 0), (3, 1), (5, 2), (6, 3)])
+def factored_and_dense(request):
+    (n, seed) = request.param
+    rng = np.random.default_rng(seed)
+    (A, B) = (rng.integers(-3, 10, (n, n)), rng.integers(-3, 10, (n, n)))  # noqa: N806
+    return (dh.FactoredQ(A=A, B=B), dh.AB_to_q(A, B))
+
+
+def test_factored_q_int_indexing(factored_and_dense):
+    (q, dense) = factored_and_dense
+    n = q.shape[0]
+    assert q.shape == dense.shape
+    for i in range(n):
+        np.testing.assert_array_equal(np.asarray(q[i]), dense[i])
+        for j in range(n):
+            np.testing.assert_array_equal(np.asarray(q[i][j]), dense[i][j])
+            np.testing.assert_array_equal(q[i, j], dense[i, j])
+            for k in range(n):
+                np.testing.assert_array_equal(np.asarray(q[i][j][k]), dense[i][j][k])
+                for l in range(n):  # noqa: E741
+                    assert q[i][j][k][l] == dense[i][j][k][l]
+                    assert q[i, j, k, l] == dense[i, j, k, l]
+
+
+def test_factored_q_slices_and_index_arrays(factored_and_dense):
+    (q, dense) = factored_and_dense
+    n = q.shape[0]
+    np.testing.assert_array_equal(q[:, 0], dense[:, 0])
+    np.testing.assert_array_equal(q[0, :, n - 1], dense[0, :, n - 1])
+    np.testing.assert_array_equal(q[:, :, 0, 1 % n], dense[:, :, 0, 1 % n])
+    np.testing.assert_array_equal(q[1 % n:, :, ::2], dense[1 % n:, :, ::2])
+    idx = np.arange(n)[::-1]
+    perm = np.random.default_rng(n).permutation(n)
+    np.testing.assert_array_equal(q[idx[:, None], perm[:, None], idx[None, :], perm[None, :]],
+                                  dense[idx[:, None], perm[:, None], idx[None, :], perm[None, :]])
+    np.testing.assert_array_equal(q[idx, perm, perm, idx], dense[idx, perm, perm, idx])
+
+
+def test_factored_q_reductions(factored_and_dense):
+    (q, dense) = factored_and_dense
+    np.testing.assert_array_equal(np.asarray(q), dense)
+    assert q.sum() == dense.sum()
+    np.testing.assert_array_equal(q.sum(axis=(2, 3)), dense.sum(axis=(2, 3)))
+    np.testing.assert_array_equal(q.sum(axis=(0, 1)), dense.sum(axis=(0, 1)))
+    assert q.min() == dense.min()
+    assert q.max() == dense.max()
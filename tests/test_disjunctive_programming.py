@@ -0,0 +1,29 @@
+import itertools
+import numpy as np
+import pytest
+import data_handler as dh
+from disjunctive_programming import SubProblemDP, analytic_cut_coefficients, cut_coefficients
+
+
+@pytest.mark.parametrize(('n', 'seed'), [(3, 0), (4, 1), (5, 2), (6, 3)])
+def test_analytic_cut_coefficients_match_gurobi(n, seed):
+    rng = np.random.default_rng(seed)
+    (A, B) = (rng.integers(0, 10, (n, n)), rng.integers(0, 10, (n, n)))  # noqa: N806
+    q = dh.FactoredQ(A=A, B=B)
+    perm = rng.permutation(n)
+    x_hat_val = np.eye(n)[perm]
+    perms = [np.array(p) for p in itertools.permutations(range(n))]
+    for i in range(n):
+        j = int(perm[i])
+        spdp = SubProblemDP(x_hat_val=x_hat_val, i=i, j=j, q=q, gp_sp_output=False)
+        spdp.optimize()
+        w_bar = spdp.get_obj_val()
+        cut_coef = analytic_cut_coefficients(q=q, perm=perm, i=i, j=j)
+        # both cuts are tight at x_hat, the dual objective equals the subproblem objective
+        assert (cut_coef * x_hat_val).sum() == pytest.approx(w_bar)
+        assert (cut_coefficients(spdp) * x_hat_val).sum() == pytest.approx(w_bar)
+        # and the analytic cut is valid, w[i,j] of every permutation is at least its right hand side
+        for other in perms:
+            w = sum(q[i][j][k][int(other[k])] for k in range(n) if k != i) if other[i] == j else 0.
+            assert (cut_coef * np.eye(n)[other]).sum() <= w + 1e-9
+        spdp.model.dispose()
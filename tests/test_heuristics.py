@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import checker as ch
+import heuristics as hr
+
+
+def random_AB(n: int, seed: int) -> tuple[np.ndarray, np.ndarray]:  # noqa: N802
+    """Returns asymmetric A and B with nonzero diagonals and negative entries, the general case of the deltas"""
+    rng = np.random.default_rng(seed)
+    return (rng.integers(-3, 10, (n, n)), rng.integers(-3, 10, (n, n)))
+
+
+@pytest.mark.parametrize('n', [2, 3, 4, 5, 6])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_swap_deltas_match_recompute(n, seed):
+    (A, B) = random_AB(n=n, seed=seed)  # noqa: N806
+    perm = np.random.default_rng(seed).permutation(n)
+    cost = ch.comp_obj_val_perm(perm=perm, A=A, B=B)
+    delta = hr.swap_deltas(A=A, B=B, perm=perm)
+    for r in range(n):
+        for s in range(n):
+            swapped = perm.copy()
+            swapped[[r, s]] = swapped[[s, r]]
+            assert delta[r, s] == ch.comp_obj_val_perm(perm=swapped, A=A, B=B) - cost
+
+
+@pytest.mark.parametrize('n', [2, 3, 4, 5, 6])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_update_swap_deltas_match_swap_deltas(n, seed):
+    (A, B) = random_AB(n=n, seed=seed)  # noqa: N806
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(n)
+    delta = hr.swap_deltas(A=A, B=B, perm=perm)
+    for _ in range(20):
+        (r, s) = rng.choice(n, size=2, replace=False)
+        perm[[r, s]] = perm[[s, r]]
+        hr.update_swap_deltas(A=A, B=B, perm=perm, delta=delta, r=r, s=s)
+        np.testing.assert_array_equal(delta, hr.swap_deltas(A=A, B=B, perm=perm))
@@ -45,6 +45,7 @@ def extract_data_from_file(filepath):
     data['ObjBound'] = extract_float(r'\nmodel.ObjBound:\s*(\S+)')
     data['ObjBoundC'] = extract_float(r'\nmodel.ObjBoundC:\s*(\S+)')
     data['raw_time'] = extract_float(r"\nextra_info:.*'raw_time':\s*([^,\}\n\r]+)[\},]")
+    data['build_time'] = extract_float(r"\nextra_info:.*'build_time':\s*([^,\}\n\r]+)[\},]")
     data['callback_call_count'] = extract_int(r'\nmodel._callback_call_count:\s*(\S+)')
     data['benders_started_count'] = extract_int(r'\nmodel._benders_started_count:\s*(\S+)')
     data['total_time_in_user_cb'] = extract_float(r'\nmodel._total_time_in_user_cb:\s*(\S+)')